@@ -11,10 +11,14 @@ from florisse.GeneralWindFarmComponents import add_gen_params_IdepVarComps
 class AEPGroup(Group):
     """
     Group containing all necessary components for wind plant AEP calculations using the FLORIS model
+
+    With optimizingLayout, the turbine positions are design variables, so the
+    hermite method, whose dpower_ddirection is an input fixed by the caller,
+    and the symmetry_map, built from the initial layout, are not allowed.
     """
 
     def __init__(self, nTurbines, nDirections=1, use_rotor_components=False, datasize=0,
-                 differentiable=True, optimizingLayout=False, nSamples=0, method_dict=None):
+                 differentiable=True, optimizingLayout=False, nSamples=0, method_dict=None, symmetry_map=None):
 
         super(AEPGroup, self).__init__()
 
@@ -31,6 +35,18 @@ class AEPGroup(Group):
         self.add('dv1', IndepVarComp('windSpeeds', np.zeros(nDirections), units=wind_speed_units), promotes=['*'])
         self.add('dv2', IndepVarComp('weights', np.zeros(nDirections)), promotes=['*'])
 
+        # For a symmetric layout only the directions of the fundamental sector are evaluated,
+        # symmetry_map[i] is the evaluated direction that gives the power of the direction i
+        if symmetry_map is None:
+            nEval = nDirections
+        else:
+            if optimizingLayout:
+                raise ValueError('the symmetry_map comes from the initial layout, it cannot be used '
+                                 'with the layout as design variable')
+            nEval = int(np.max(symmetry_map)) + 1
+            self.add('dv0e', IndepVarComp('windDirectionsEval', np.zeros(nEval), units=direction_units), promotes=['*'])
+            self.add('dv1e', IndepVarComp('windSpeedsEval', np.zeros(nEval), units=wind_speed_units), promotes=['*'])
+
         self.add('dv3', IndepVarComp('turbineX', np.zeros(nTurbines), units=turbine_units), promotes=['*'])
         self.add('dv4', IndepVarComp('turbineY', np.zeros(nTurbines), units=turbine_units), promotes=['*'])
 
@@ -46,8 +62,8 @@ class AEPGroup(Group):
         add_gen_params_IdepVarComps(self, datasize=datasize)
 
         # add components and groups
-        self.add('windDirectionsDeMUX', DeMUX(nDirections, units=direction_units))
-        self.add('windSpeedsDeMUX', DeMUX(nDirections, units=wind_speed_units))
+        self.add('windDirectionsDeMUX', DeMUX(nEval, units=direction_units))
+        self.add('windSpeedsDeMUX', DeMUX(nEval, units=wind_speed_units))
 
         pg = self.add('all_directions', ParallelGroup(), promotes=['*'])
 
@@ -58,7 +74,7 @@ class AEPGroup(Group):
 
         #The if nSamples == 0 is left in for visualization
         if use_rotor_components:
-            for direction_id in np.arange(0, nDirections):
+            for direction_id in np.arange(0, nEval):
                 # print 'assigning direction group %i' % direction_id
                 pg.add('direction_group%i' % direction_id,
                        DirectionGroup(nTurbines=nTurbines, direction_id=direction_id,
@@ -75,7 +91,7 @@ class AEPGroup(Group):
                                   'wsPositionZ', 'wtVelocity%i' % direction_id,
                                   'wtPower%i' % direction_id, 'dir_power%i' % direction_id, 'wsArray%i' % direction_id]))
         else:
-            for direction_id in np.arange(0, nDirections):
+            for direction_id in np.arange(0, nEval):
                 # print 'assigning direction group %i' % direction_id
                 pg.add('direction_group%i' % direction_id,
                        DirectionGroup(nTurbines=nTurbines, direction_id=direction_id,
@@ -93,27 +109,63 @@ class AEPGroup(Group):
                                   'dir_power%i' % direction_id, 'wsArray%i' % direction_id]))
 
         # Specify how the energy statistics are computed
-        self.add('powerMUX', MUX(nDirections, units=power_units))
+        self.add('powerMUX', MUX(nEval, units=power_units))
+        if symmetry_map is not None:
+            self.add('powerMap', SymmetryMap(symmetry_map))
         method = method_dict['method']
-        if method == 'dakota':
+        if method_dict.get('multifidelity', False):
+            # Any rule, corrected with the Jensen model at method_dict['cheap_n'] points
+            if use_rotor_components:
+                raise ValueError('the multifidelity correction computes the Jensen power from Cp_in, '
+                                 'which is not an input of the group with use_rotor_components')
+            self.add('AEPcomp', MultiFidelityStatistics(nTurbines, nDirections, method_dict), promotes=['*'])
+        elif method == 'dakota':
             self.add('AEPcomp', DakotaStatistics(nDirections, method_dict), promotes=['*'])
         elif method == 'chaospy':
             self.add('AEPcomp', ChaospyStatistics(nDirections, method_dict), promotes=['*'])
-        elif method == 'rect':
+        elif method in ['rect', 'fejer', 'sparse', 'sobol', 'halton', 'lhs', 'importance']:
             self.add('AEPcomp', RectStatistics(nDirections, method_dict), promotes=['*'])
+        elif method == 'hermite':
+            # The derivatives of the power are set by the driver, e.g. from calc_gradient as
+            # runHermite, nothing in the group computes them and zero slopes give a wrong AEP
+            if optimizingLayout:
+                raise ValueError('the hermite method cannot be used with the layout as design variable, '
+                                 'dpower_ddirection would keep its values while the turbines move')
+            if not method_dict.get('supplied_derivatives', False):
+                raise ValueError('the hermite method needs dpower_ddirection from the caller, '
+                                 'set method_dict["supplied_derivatives"] = True once it is set')
+            self.add('dv11', IndepVarComp('dpower_ddirection', np.zeros(nDirections), units='kW/deg'), promotes=['*'])
+            self.add('AEPcomp', HermiteStatistics(nDirections, method_dict), promotes=['*'])
+        elif method == 'regression':
+            self.add('AEPcomp', RegressionStatistics(nDirections, method_dict), promotes=['*'])
+        elif method == 'rect-extrapolated':
+            self.add('AEPcomp', RichardsonStatistics(nDirections, method_dict), promotes=['*'])
+        elif method == 'periodic':
+            if getattr(method_dict['distribution'], 'direction_dist', None) is None:
+                self.add('AEPcomp', FourierStatistics(nDirections, method_dict), promotes=['*'])
+            else:  # the Fourier interpolation is only in direction
+                self.add('AEPcomp', RectStatistics(nDirections, method_dict), promotes=['*'])
         else:
-            print "Specify one of these UQ methods = ['dakota', 'chaospy', 'rect']"
+            print "Specify one of these UQ methods = ['dakota', 'chaospy', 'rect', 'fejer', 'sparse', 'sobol', 'halton', 'lhs', 'periodic', 'importance', 'rect-extrapolated', 'hermite', 'regression']"
             sys.exit()
 
         # connect components
-        self.connect('windDirections', 'windDirectionsDeMUX.Array')
-        self.connect('windSpeeds', 'windSpeedsDeMUX.Array')
-        for direction_id in range(0, nDirections):
+        if symmetry_map is None:
+            self.connect('windDirections', 'windDirectionsDeMUX.Array')
+            self.connect('windSpeeds', 'windSpeedsDeMUX.Array')
+        else:
+            self.connect('windDirectionsEval', 'windDirectionsDeMUX.Array')
+            self.connect('windSpeedsEval', 'windSpeedsDeMUX.Array')
+        for direction_id in range(0, nEval):
             self.add('y%i' % direction_id, IndepVarComp('yaw%i' % direction_id, np.zeros(nTurbines), units=direction_units), promotes=['*'])
             self.connect('windDirectionsDeMUX.output%i' % direction_id, 'direction_group%i.wind_direction' % direction_id)
             self.connect('windSpeedsDeMUX.output%i' % direction_id, 'direction_group%i.wind_speed' % direction_id)
             self.connect('dir_power%i' % direction_id, 'powerMUX.input%i' % direction_id)
-        self.connect('powerMUX.Array', 'power')
+        if symmetry_map is None:
+            self.connect('powerMUX.Array', 'power')
+        else:
+            self.connect('powerMUX.Array', 'powerMap.powerEval')
+            self.connect('powerMap.power', 'power')
 
 
 
@@ -18,7 +18,7 @@ if __name__ == "__main__":
     # method_dict = {}
     # keys of method_dict:
     #     'method' = 'dakota', 'rect' or 'chaospy'  # 'chaospy' needs updating
-    #     'uncertain_var' = 'speed' or 'direction'
+    #     'uncertain_var' = 'speed', 'direction' or 'joint'
     #     'layout' = 'amalia', 'optimized', 'grid', 'random', 'lhs', 'test'
     #                   'layout1', 'layout2', 'layout3'
     #     'distribution' = a distribution object
@@ -35,8 +35,11 @@ if __name__ == "__main__":
     elif method_dict['uncertain_var'] == 'direction':
         dist = distributions.getWindRose()
         method_dict['distribution'] = dist
+    elif method_dict['uncertain_var'] == 'joint':
+        dist = distributions.getJointWindRose()
+        method_dict['distribution'] = dist
     else:
-        raise ValueError('unknown uncertain_var option "%s", valid options "speed" or "direction".' %method_dict['uncertain_var'])
+        raise ValueError('unknown uncertain_var option "%s", valid options "speed", "direction" or "joint".' %method_dict['uncertain_var'])
 
     method_dict['dakota_filename'] = 'dakotageneral.in'
 
@@ -52,8 +55,13 @@ if __name__ == "__main__":
         # For wind direction
         windspeeds = np.ones(n)*8
         winddirections = points
+    elif method_dict['uncertain_var'] == 'joint':
+        # For wind direction and wind speed together
+        winddirections = points[0]
+        windspeeds = points[1]
     else:
-        raise ValueError('unknown uncertain_var option "%s", valid options "speed" or "direction".' %method_dict['uncertain_var'])
+        raise ValueError('unknown uncertain_var option "%s", valid options "speed", "direction" or "joint".' %method_dict['uncertain_var'])
+    n = len(weights)  # number of (direction, speed) pairs at which power is evaluated
 
     print('Locations at which power is evaluated')
     print('\twindspeed \t winddirection')
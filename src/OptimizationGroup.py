@@ -72,7 +72,7 @@ class OptAEP(Group):
         # add major components and groups
         self.add('AEPgroup', AEPGroup(nTurbines, nDirections=nDirections,
                             use_rotor_components=use_rotor_components, differentiable=differentiable,
-                            method_dict=method_dict), promotes=['*'])                                      
+                            optimizingLayout=True, method_dict=method_dict), promotes=['*'])                                      
 
         self.add('spacing_comp', SpacingComp(nTurbines=nTurbines), promotes=['*'])
 
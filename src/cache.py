@@ -0,0 +1,133 @@
+import os
+import hashlib
+import pickle
+import tempfile
+import numpy as np
+from collections import OrderedDict
+
+
+def hashKey(*args):
+    """Hash the content of the arguments.
+
+    Args:
+        *args: plain python values that define the cached value, e.g. the
+            keyFields of a distribution, an order and a method name
+
+    Returns:
+        key (string): hex digest of the pickled arguments
+
+    """
+    return hashlib.sha1(pickle.dumps(args, 2)).hexdigest()
+
+
+def keyFields(value):
+    """Plain python values that define value, to hash in a cache key.
+
+    The pickle of distribution objects and numpy arrays is not the same in
+    every process, so they are replaced by scalars and tuples: an object
+    with a key() method, e.g. the distributions, by its key(), arrays,
+    lists and tuples by tuples, numpy scalars by python scalars. Other
+    values are kept as they are.
+    """
+    if hasattr(value, 'key'):
+        return keyFields(value.key())
+    if isinstance(value, np.ndarray):
+        return tuple(value.tolist())
+    if isinstance(value, (list, tuple)):
+        return tuple(keyFields(v) for v in value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class LRUCache(object):
+    """In memory cache that evicts the least recently used entry."""
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            value = self.data.pop(key)
+        except KeyError:
+            return default
+        self.data[key] = value  # move to the most recently used end
+        return value
+
+    def set(self, key, value):
+        self.data.pop(key, None)
+        self.data[key] = value
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def clear(self):
+        self.data.clear()
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+
+class DiskCache(object):
+    """On disk cache, one pickle file per key in cache_dir.
+
+    The files are written to a temporary name and then renamed, so several
+    scripts or jobs can share the same directory.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        if not os.path.isdir(cache_dir):
+            try:
+                os.makedirs(cache_dir)
+            except OSError:  # created by another process in the meantime
+                if not os.path.isdir(cache_dir):
+                    raise
+
+    def _filename(self, key):
+        return os.path.join(self.cache_dir, key + '.pkl')
+
+    def get(self, key, default=None):
+        try:
+            with open(self._filename(key), 'rb') as f:
+                return pickle.load(f)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return default
+
+    def set(self, key, value):
+        fd, tmpname = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, 2)
+        os.rename(tmpname, self._filename(key))
+
+    def __contains__(self, key):
+        return os.path.isfile(self._filename(key))
+
+
+def getCached(key, compute, memory, disk=None):
+    """Get a value from the caches, computing and storing it if missing.
+
+    Args:
+        key (string): key from hashKey
+        compute (callable): called without arguments to compute the value
+        memory (LRUCache): in memory cache
+        disk (DiskCache): optional on disk cache, checked after memory
+
+    Returns:
+        value: the cached or computed value
+
+    """
+    value = memory.get(key)
+    if value is not None:
+        return value
+    if disk is not None:
+        value = disk.get(key)
+    if value is None:
+        value = compute()
+        if disk is not None:
+            disk.set(key, value)
+    memory.set(key, value)
+    return value
@@ -4,18 +4,21 @@ import sys
 import shutil
 
 
-def parseDakotaParametersFile(paramsfilename):
-    """Return parameters for application."""
+# setup regular expressions for parameter/label matching
+e = r'-?(?:\d+\.?\d*|\.\d+)[eEdD](?:\+|-)?\d+'  # exponential notation
+f = r'-?\d+\.\d*|-?\.\d+'                       # floating point
+i = r'-?\d+'                                    # integer
+value = e + '|' + f + '|' + i                   # numeric field
+tag = r'\w+(?::\w+)*'                           # text tag field
+
+# regular expression for standard parameters format
+standard_regex = re.compile('^\s*(' + value + ')\s+(' + tag + ')$')
+# in batch mode the eval_id is <batch>:<eval>
+batch_regex = re.compile('^\s*(' + value + '|\d+(?::\d+)+)\s+(' + tag + ')$')
 
-    # setup regular expressions for parameter/label matching
-    e = r'-?(?:\d+\.?\d*|\.\d+)[eEdD](?:\+|-)?\d+'  # exponential notation
-    f = r'-?\d+\.\d*|-?\.\d+'                       # floating point
-    i = r'-?\d+'                                    # integer
-    value = e + '|' + f + '|' + i                   # numeric field
-    tag = r'\w+(?::\w+)*'                           # text tag field
 
-    # regular expression for standard parameters format
-    standard_regex = re.compile('^\s*(' + value + ')\s+(' + tag + ')$')
+def parseDakotaParametersFile(paramsfilename):
+    """Return parameters for application."""
 
     # open DAKOTA parameters file for reading
     paramsfile = open(paramsfilename, 'r')
@@ -33,6 +36,36 @@ def parseDakotaParametersFile(paramsfilename):
     return paramsdict
 
 
+def parseDakotaBatchParametersFile(paramsfilename):
+    """Return the parameters of every evaluation in a batch parameters file.
+
+    With the batch keyword of the interface, Dakota writes the parameters
+    of all the evaluations one after the other in the same file, each one
+    starts with its number of variables, and the eval_id can be the
+    compound <batch>:<eval>, see evalId. A file of a single evaluation
+    gives a list of one dictionary.
+    """
+
+    paramsfile = open(paramsfilename, 'r')
+
+    paramsdicts = []
+    for line in paramsfile:
+        m = batch_regex.match(line)
+        if m:
+            if m.group(2) == 'variables':  # first line of the next evaluation
+                paramsdicts.append({})
+            paramsdicts[-1][m.group(2)] = m.group(1)
+
+    paramsfile.close()
+
+    return paramsdicts
+
+
+def evalId(paramsdict):
+    """Number of the evaluation, the last field of a compound <batch>:<eval> eval_id."""
+    return int(paramsdict['eval_id'].split(':')[-1])
+
+
 def checknVar(nvar, paramsdict):
     """Check to make sure we have the right number of uncertain variables."""
     num_vars = 0
@@ -48,6 +81,31 @@ def writeDakotaResultsFile(
         resultfilename, resultsdict, paramsdict, active_set_vector):
     """Write results of application for Dakota."""
 
+    # write outputfile
+    outfile = open(resultfilename, 'w')
+    writeResults(outfile, resultsdict, paramsdict, active_set_vector)
+    outfile.close()
+
+
+def writeDakotaBatchResultsFile(
+        resultfilename, resultsdicts, paramsdicts, active_set_vectors):
+    """Write the results of every evaluation of a batch for Dakota.
+
+    The results of the evaluations are in the order of the parameters file,
+    separated by a line that starts with #.
+    """
+
+    outfile = open(resultfilename, 'w')
+    for k in range(len(resultsdicts)):
+        if k > 0:
+            outfile.write('#\n')
+        writeResults(outfile, resultsdicts[k], paramsdicts[k], active_set_vectors[k])
+    outfile.close()
+
+
+def writeResults(outfile, resultsdict, paramsdict, active_set_vector):
+    """Write the results of one evaluation to an open file."""
+
     # Make sure number of functions is as expected.
     num_fns = 0
     if 'functions' in paramsdict:
@@ -55,9 +113,6 @@ def writeDakotaResultsFile(
     if num_fns != len(resultsdict['fns']):
         raise Exception('Number of functions not as expected.')
 
-    # write outputfile
-    outfile = open(resultfilename, 'w')
-
     for func_ind in range(0, num_fns):
         # write functions
         if active_set_vector[func_ind] & 1:
@@ -74,8 +129,6 @@ def writeDakotaResultsFile(
                 outfile.write(str(deriv) + ' ')
             outfile.write(']\n')
 
-    outfile.close()
-
 
 # -------------------------------------------------------------------
 #  Output Redirection
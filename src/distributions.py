@@ -1,13 +1,54 @@
+import os
 import chaospy as cp
 import numpy as np
 # import matplotlib.pyplot as plt
-from scipy.interpolate import interp1d
 from scipy import special
+from quadrature_rules import gaussPieces, stieltjes
+
+
+def _windrose_path(filename):
+    # Bare file names are looked up in the WindRoses directory of the repo
+    if os.path.dirname(filename) == '':
+        filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'WindRoses', filename)
+    return filename
+
+
+def _getstate(self):
+    # Pickle without the recurrence coefficients computed on demand, so the
+    # pickle, and the cache keys made from it, only depend on the definition
+    state = self.__dict__.copy()
+    state.pop('_ttr_coeffs', None)
+    return state
+
+
+def _ttr(dist, k, minOrder=128):
+    # Recurrence coefficients of the object dist from its _discretize
+    # method. They are computed once, up to minOrder or the largest k
+    # requested, and kept in dist._ttr_coeffs.
+    k = np.asarray(k, dtype=int)
+    order = max(int(np.max(k)) + 1, minOrder)
+    coeffs = getattr(dist, '_ttr_coeffs', None)
+    if coeffs is None or order > len(coeffs[0]):
+        x, w = dist._discretize(order)
+        coeffs = stieltjes(x, w, order)
+        dist._ttr_coeffs = coeffs
+    alpha, beta = coeffs
+    return alpha[k], beta[k]
+
+
+def _mom(dist, k):
+    # Raw moments of the object dist from its _discretize method, normalized
+    # by the total probability
+    k = np.asarray(k, dtype=float)
+    x, w = dist._discretize(int(np.max(k))//2 + 1)
+    return np.sum(w*np.power(x, k[..., np.newaxis]), -1)/np.sum(w)
 
 
 class amaliaWindRose(object):
     """The smoothed amalia distribution."""
 
+    __getstate__ = _getstate
+
     def __init__(self):
 
         # f(x)
@@ -24,116 +65,350 @@ class amaliaWindRose(object):
         self.hi = 360.0
         self.A = 110  # Left boundary of zero probability region
         self.B = 140  # Right boundary of zero probability region
-        # self.C = 225  # Location of max probability
+        self.C = 225  # Location of max probability
+
+        # Coefficients of the polynomial fit, highest power first
+        self.coeffs = np.array([493597.250387841, -207774.160030495, -413203.013010848,
+                                158080.893880027, 127607.500730722, -44242.1722820275,
+                                -17735.2623897828, 5422.11156037294, 1057.31910521884,
+                                -253.807324825523, -19.8973363502958, 1.43458543839655,
+                                1.05778787373732])
+        # Coefficients of the antiderivative of the polynomial fit
+        self.int_coeffs = np.polyint(self.coeffs)
+
+        A = self.A
+        B = self.B
+        a = B  # 140
+        b = self.hi - self.lo + A  # 470
+        # Integral of the polynomial from the [-0.5,0.5] value at lo, at A and at B
+        self._Q_lo = np.polyval(self.int_coeffs, (self.lo + 360 - (b+a)/2.) / (b-a))
+        self._Q_A = np.polyval(self.int_coeffs, 0.5)
+        self._Q_B = np.polyval(self.int_coeffs, -0.5)
+        self._cdf_A = self._Q_A - self._Q_lo  # probability between lo and A
+        self._cdf_turn = self._cdf_helper(np.array(self.hi))  # probability between lo and hi
+
+        # Monotone table of the inverse cdf used in ppf. The table is uniform
+        # in probability on each side of the zero probability region, so a
+        # lookup needs no search. A and B share the same cdf value.
+        nTable = 2048
+        F_A = self._cdf_A
+        F_hi = self._cdf_turn
+        x_left = self._invert_cdf(np.linspace(0.0, F_A, nTable+1), self.lo, A)
+        x_right = self._invert_cdf(np.linspace(F_A, F_hi, nTable+1), B, self.hi)
+        self._ppf_n = nTable
+        self._ppf_dF = np.array([F_A/nTable, (F_hi-F_A)/nTable])
+        self._ppf_x = np.concatenate((x_left, x_right))
+        self._ppf_slope = 1./self.pdf(self._ppf_x)  # derivative of the inverse cdf
 
     def pdf(self, x):
-        x = x.flatten()  # In the constructor of the distribution it gets made a 2d array for some reason. But not for cdf
-        f = self._wind_rose_poly_func()  # This will give me different results for the rectangle method. It's because the values were different
-        return f(x)
+        x = np.asarray(x, dtype=float).flatten()  # In the constructor of the distribution it gets made a 2d array for some reason. But not for cdf
+        return self._f_helper(x)
 
     def cdf(self, x):
-        # Integrate by rectangle rule
-        # dx = 0.001  # interval spacing
-        cdf = []
-        for x_i in np.array(x, copy=False, ndmin=1):  # makes it work if x is a scalar
-            dx = x_i/100.  # interval spacing
-            if x_i == 0:
-                cdf.append(0.0)
-            else:
-                X = np.arange(dx/2, x_i, dx)
-                cdf.append(np.sum(self.pdf(X)*dx))  # integration by rectangle rule
-        return np.array(cdf)
+        # Exact integral of the piecewise polynomial pdf, using the
+        # antiderivative coefficients computed in the constructor.
+        # The cdf is extended periodically outside of [lo, hi]; each full
+        # turn adds the total probability.
+        x = np.array(x, dtype=float, copy=False, ndmin=1)  # makes it work if x is a scalar
+        r = self.hi - self.lo
+        turns = np.floor((x - self.lo)/r)
+        xm = x - turns*r
+        return turns*self._cdf_turn + self._cdf_helper(xm)
+
+    def ppf(self, q):
+        # Inverse of the cdf normalized by the total probability. Cubic
+        # Hermite interpolation in the precomputed table, the slopes of the
+        # inverse are 1/pdf at the table points.
+        q = np.asarray(q, dtype=float)
+        F = np.clip(q, 0.0, 1.0).flatten()*self._cdf_turn
+        n = self._ppf_n
+        right = F > self._cdf_A
+        dF = np.where(right, self._ppf_dF[1], self._ppf_dF[0])
+        t = np.where(right, F - self._cdf_A, F)/dF
+        j = np.clip(np.floor(t), 0, n-1).astype(int)
+        t = t - j
+        j = j + right*(n+1)  # index in the table
+        x0 = self._ppf_x[j]
+        x1 = self._ppf_x[j+1]
+        m0 = self._ppf_slope[j]*dF
+        m1 = self._ppf_slope[j+1]*dF
+        t2 = t*t
+        t3 = t2*t
+        x = (2*t3 - 3*t2 + 1)*x0 + (t3 - 2*t2 + t)*m0 + (-2*t3 + 3*t2)*x1 + (t3 - t2)*m1
+        x = np.clip(x, x0, x1)
+        return x.reshape(q.shape)
+
+    def _invert_cdf(self, F, lo, hi, nIter=4):
+        # Solve cdf(x) = F for x in [lo, hi] with a few Newton iterations,
+        # starting from a linear interpolation of the cdf. Only used to build
+        # the ppf table.
+        x_table = np.linspace(lo, hi, len(F))
+        x = np.interp(F, self.cdf(x_table), x_table)
+        for i in range(nIter):
+            x = np.clip(x - (self.cdf(x) - F)/self.pdf(x), lo, hi)
+        return x
+
+    def mom(self, k):
+        return _mom(self, k)
+
+    def ttr(self, k):
+        return _ttr(self, k)
+
+    def _discretize(self, order):
+        # Nodes and weights exact for pdf times a polynomial of degree
+        # 2*order+1, the pdf is a polynomial of degree 12 on each side of the
+        # zero probability region
+        x, w = gaussPieces([self.lo, self.A, self.B, self.hi], order + 8)
+        return x, w*self.pdf(x)
 
     def str(self):
         return "Amalia windrose"
 
+    def key(self):
+        # Scalars that define the distribution, for the cache keys
+        return ('amaliaWindRose', tuple(self.coeffs.tolist()), self.A, self.B, self.C)
+
     def bnd(self):
         return (self.lo, self.hi)
 
-    def _wind_rose_poly_func(self):
-        def f(x):
-            return np.array([self._f_helper(z) for z in x])
-        return f
-
     def _windrose_polyfit(self, x):
-        y = 493597.250387841  *np.power(x, 12) + \
-            -207774.160030495 *np.power(x, 11) + \
-            -413203.013010848 *np.power(x, 10) + \
-            158080.893880027  *np.power(x, 9) + \
-            127607.500730722  *np.power(x, 8) + \
-            -44242.1722820275 *np.power(x, 7) + \
-            -17735.2623897828 *np.power(x, 6) + \
-            5422.11156037294  *np.power(x, 5) + \
-            1057.31910521884  *np.power(x, 4) + \
-            -253.807324825523 *np.power(x, 3) + \
-            -19.8973363502958 *np.power(x, 2) + \
-            1.43458543839655  *np.power(x, 1) + \
-            1.05778787373732  *np.power(x, 0)
-        return y
+        # Evaluated in Horner form, np.polyval works on whole arrays at once
+        return np.polyval(self.coeffs, x)
 
     def _f_helper(self, x):
         # Linear transformation from interval [a,b] to [-0.5,0.5]
+        # Works on arrays, the zero probability region and the wrap around
+        # are handled with masks instead of a branch per point.
+        x = np.asarray(x, dtype=float)
         A = self.A
         B = self.B
         a = B  # 140
         b = self.hi - self.lo + A  # 470
-        if x >= B:
-            x1 = (x - (b+a)/2.) / (b-a)
-            return self._windrose_polyfit(x1)/330  # The 330 comes from 360-(B-A)=R in quadrature rules
-            # return self._windrose_polyfit(x1)/360
-        elif x <= A:
-            x1 = (x + 360 - (b+a)/2.) / (b-a)
-            return self._windrose_polyfit(x1)/330
-            # return self._windrose_polyfit(x1)/360
-        else:
-            # If I'm only calling the pdf I should not go in here, but when calling the cdf I get in here.
-            return 0.0
+        R = b - a  # 330, comes from 360-(B-A)=R in quadrature rules
+        right = x >= B
+        left = x <= A  # wraps around, x + 360
+        x1 = np.where(right, x, x + 360)
+        x1 = (x1 - (b+a)/2.) / (b-a)
+        f = np.zeros(x.shape)
+        mask = right | left  # Between A and B the probability is zero
+        f[mask] = self._windrose_polyfit(x1[mask])/R
+        return f
+
+    def _cdf_helper(self, x):
+        # Integral of the pdf from lo to x, for x in [lo, hi]. The change of
+        # variables to [-0.5,0.5] cancels the 1/R of the pdf.
+        x = np.asarray(x, dtype=float)
+        A = self.A
+        B = self.B
+        a = B  # 140
+        b = self.hi - self.lo + A  # 470
+        right = x >= B
+        left = x <= A  # wraps around, x + 360
+        x1 = np.where(right, x, x + 360)
+        x1 = np.clip((x1 - (b+a)/2.) / (b-a), -0.5, 0.5)
+        Q = np.polyval(self.int_coeffs, x1)
+        F = np.where(left, Q - self._Q_lo, self._cdf_A)  # Flat between A and B
+        F = np.where(right, self._cdf_A + Q - self._Q_B, F)
+        return F
 
 
 class amaliaWindRoseRaw(object):
-    """The raw amalia distribution."""
+    """The raw amalia distribution.
 
-    def __init__(self):
+    The pdf is the linear interpolant of the tabulated probabilities, the
+    empty directions get a small probability. The zero probability region
+    (A, B) spans the widest run of directions with probability <= tol, and C
+    is the most probable direction.
+    """
+
+    __getstate__ = _getstate
+
+    def __init__(self, inputfile=None, tol=1e-4):
         self.lo = 0.0
         self.hi = 360.0
-        self.inputfile = '../WindRoses/amalia_windrose_8.txt'
+        if inputfile is None:
+            inputfile = 'windrose_amalia_8ms.txt'
+        self.inputfile = _windrose_path(inputfile)
+
+        # Load the wind rose once, the pdf, cdf and ppf only use these tables
+        self.x, self.f, self.F = self._wind_rose_func()
+        self.slope = np.diff(self.f)/np.diff(self.x)  # of the pdf between the data points
+
+        # Zero probability region, the widest run of (nearly) empty directions
+        empty = np.concatenate(([False], self._p <= tol, [False]))
+        edges = np.flatnonzero(np.diff(empty.astype(int)))
+        starts, ends = edges[::2], edges[1::2]
+        if len(starts) > 0:
+            k = np.argmax(ends - starts)
+            self.A = self.x[starts[k]]  # Left boundary of zero probability region
+            self.B = self.x[ends[k]-1]  # Right boundary of zero probability region
+        else:
+            self.A = self.lo  # No zero probability region
+            self.B = self.lo
+        self.C = self.x[np.argmax(self.f)]  # Location of max probability
 
     def _wind_rose_func(self):
+        # Columns of the file are direction, speed, probability
         wind_data = np.loadtxt(self.inputfile)
+        directions = wind_data[:, 0]
+        wind_data = wind_data[:, 2]
+        self._p = wind_data.copy()  # the tabulated probabilities
         wind_data[wind_data == 0] = 2.00000000e-05  # Update were the wind data is zero to the next lowest value
-        step = 360/len(wind_data)
+        step = 360./len(wind_data)
         wind_data = np.append(wind_data, wind_data[0])  # Include the value at 360, which is the same as 0.
         wind_data = wind_data/step  # normalize for the [0, 360] range.
-        x = np.array(range(0,360+1,step))
-        f = interp1d(x, wind_data)
-        return f
+        x = np.append(directions, 360.0)
+        # Cumulative integral of the linear interpolant at the data points
+        F = np.concatenate(([0.0], np.cumsum((wind_data[1:] + wind_data[:-1])/2. * np.diff(x))))
+        return x, wind_data, F
 
     def pdf(self, x):
-        x = x.flatten()  # In the constructor of the distribution it gets made a 2d array for some reason. For this amalia class this flattening is unnecesary
-        f = self._wind_rose_func()
-        return f(x)
+        x = np.asarray(x, dtype=float).flatten()  # In the constructor of the distribution it gets made a 2d array for some reason. For this amalia class this flattening is unnecesary
+        return np.interp(x, self.x, self.f, period=self.hi-self.lo)
 
     def cdf(self, x):
-        # Integrate by rectangle rule
-        # dx = 0.001  # interval spacing
-        cdf = []
-        for x_i in np.array(x, copy=False, ndmin=1):  # makes it work if x is a scalar
-            dx = x_i/100.  # interval spacing
-            if x_i == 0:
-                cdf.append(0.0)
-            else:
-                X = np.arange(dx/2, x_i, dx)
-                cdf.append(np.sum(self.pdf(X)*dx))  # integration by rectangle rule
-        return np.array(cdf)
+        # Exact integral of the linear interpolant, extended periodically
+        # outside of [lo, hi].
+        x = np.array(x, dtype=float, copy=False, ndmin=1)  # makes it work if x is a scalar
+        r = self.hi - self.lo
+        turns = np.floor((x - self.lo)/r)
+        xm = x - turns*r
+        i = np.clip(np.searchsorted(self.x, xm, side='right') - 1, 0, len(self.x)-2)
+        d = xm - self.x[i]
+        return turns*self.F[-1] + self.F[i] + self.f[i]*d + 0.5*self.slope[i]*d*d
+
+    def ppf(self, q):
+        # Exact inverse of the cdf normalized by the total probability, the
+        # root of the quadratic cdf between the data points
+        q = np.asarray(q, dtype=float)
+        F = np.clip(q, 0.0, 1.0).flatten()*self.F[-1]
+        i = np.clip(np.searchsorted(self.F, F, side='right') - 1, 0, len(self.x)-2)
+        dF = F - self.F[i]
+        f0 = self.f[i]
+        # f0*d + slope*d**2/2 = dF, in the form without cancellation
+        d = 2*dF/(f0 + np.sqrt(np.maximum(f0*f0 + 2*self.slope[i]*dF, 0.0)))
+        x = np.clip(self.x[i] + d, self.x[i], self.x[i+1])
+        return x.reshape(q.shape)
+
+    def mom(self, k):
+        return _mom(self, k)
+
+    def ttr(self, k):
+        return _ttr(self, k)
+
+    def _discretize(self, order):
+        # Nodes and weights exact for pdf times a polynomial of degree
+        # 2*order+1, the pdf is linear between the data points
+        x, w = gaussPieces(self.x, order + 2)
+        return x, w*self.pdf(x)
 
     def str(self):
         return "Amalia windrose raw"
 
+    def key(self):
+        return ('amaliaWindRoseRaw', tuple(self.x.tolist()), tuple(self.f.tolist()), self.A, self.B)
+
+    def bnd(self):
+        return (self.lo, self.hi)
+
+
+class tabulatedWindRose(object):
+    """Wind rose from a tabulated file with columns direction, speed, probability.
+
+    The pdf is constant over each direction bin, the bins are centered on the
+    tabulated directions and wrap around at 360. The zero probability region
+    (A, B) is the widest run of bins with probability <= tol, and C is the
+    center of the most probable bin.
+    """
+
+    __getstate__ = _getstate
+
+    def __init__(self, inputfile='windrose_amalia_8ms.txt', tol=0.0):
+        self.lo = 0.0
+        self.hi = 360.0
+        self.inputfile = _windrose_path(inputfile)
+        self.name = os.path.splitext(os.path.basename(self.inputfile))[0]
+
+        wind_data = np.loadtxt(self.inputfile)
+        self.directions = wind_data[:, 0]
+        self.speeds = wind_data[:, 1]
+        p = wind_data[:, 2]
+        self.p = p/np.sum(p)  # make sure the probabilities add up to one
+        self.nBins = len(p)
+        self.step = (self.hi - self.lo)/self.nBins
+        self.start = self.directions[0] - self.step/2.  # left edge of the first bin
+        # Cumulative probability at the bin edges, starting at self.start
+        self.cum = np.concatenate(([0.0], np.cumsum(self.p)))
+        self._cdf_lo = self._cum_helper(self.lo)
+
+        # Zero probability region, the widest run of (nearly) empty bins
+        empty = np.concatenate(([False], self.p <= tol, [False]))
+        edges = np.flatnonzero(np.diff(empty.astype(int)))
+        starts, ends = edges[::2], edges[1::2]
+        if len(starts) > 0:
+            k = np.argmax(ends - starts)
+            self.A = self.start + starts[k]*self.step  # Left boundary of zero probability region
+            self.B = self.start + ends[k]*self.step  # Right boundary of zero probability region
+        else:
+            self.A = self.lo  # No zero probability region
+            self.B = self.lo
+        self.C = self.directions[np.argmax(self.p)]  # Location of max probability
+
+    def _cum_helper(self, x):
+        # Integral of the pdf from the left edge of the first bin to x, extended periodically
+        y = np.asarray(x, dtype=float) - self.start
+        r = self.hi - self.lo
+        turns = np.floor(y/r)
+        y = y - turns*r
+        k = np.clip(np.floor(y/self.step).astype(int), 0, self.nBins-1)
+        return turns + self.cum[k] + self.p[k]*(y - k*self.step)/self.step
+
+    def pdf(self, x):
+        x = np.asarray(x, dtype=float).flatten()  # In the constructor of the distribution it gets made a 2d array
+        k = np.floor((x - self.start)/self.step).astype(int) % self.nBins
+        return self.p[k]/self.step
+
+    def cdf(self, x):
+        # Exact integral of the piecewise constant pdf by cumulative sums
+        x = np.array(x, dtype=float, copy=False, ndmin=1)  # makes it work if x is a scalar
+        return self._cum_helper(x) - self._cdf_lo
+
+    def ppf(self, q):
+        # Exact inverse of the cdf, empty bins are never returned
+        q = np.asarray(q, dtype=float)
+        F = (np.clip(q, 0.0, 1.0).flatten() + self._cdf_lo) % 1.0
+        k = np.clip(np.searchsorted(self.cum, F, side='right') - 1, 0, self.nBins-1)
+        x = self.start + self.step*(k + (F - self.cum[k])/self.p[k])
+        x = (x - self.lo) % (self.hi - self.lo) + self.lo
+        return x.reshape(q.shape)
+
+    def mom(self, k):
+        return _mom(self, k)
+
+    def ttr(self, k):
+        return _ttr(self, k)
+
+    def _discretize(self, order):
+        # Nodes and weights exact for pdf times a polynomial of degree
+        # 2*order+1, the pdf is constant in each bin of [lo, hi]
+        edges = self.start + self.step*np.arange(self.nBins+2)
+        edges = np.concatenate(([self.lo], edges[(edges > self.lo) & (edges < self.hi)], [self.hi]))
+        x, w = gaussPieces(edges, order + 1)
+        return x, w*self.pdf(x)
+
+    def str(self):
+        return "Tabulated windrose %s" % self.name
+
+    def key(self):
+        return ('tabulatedWindRose', tuple(self.directions.tolist()), tuple(self.p.tolist()), self.A, self.B)
+
     def bnd(self):
         return (self.lo, self.hi)
 
 
 class myWeibull(object):
+    __getstate__ = _getstate
+
     def __init__(self):
         self.a = 1.8
         self.b = 12.552983
@@ -152,60 +427,226 @@ class myWeibull(object):
         f = a/b * (x/b)**(a-1) * np.exp(-(x/b)**a)
         return f
 
+    def ppf(self, q):
+        # Analytic inverse of the cdf truncated to [lo, hi], so all the
+        # samples fall inside the bounds.
+        a = self.a
+        b = self.b
+        q = np.asarray(q, dtype=float)
+        F = q*(self.cdf(self.hi) - self.cdf(self.lo)) + self.cdf(self.lo)
+        x = b * np.power(-np.log1p(-F), 1./a)
+        return x
+
     def mom(self, k):
-        # I don't think providing the moments here changes anything down the road when
-        # doing PC expansions. Although if I don't pass mom the moments calculated are
-        # bad. It appears that they just take the moments assuming a uniform with
-        # a range, as that obtained from the bounds.
-        # Actually it does affect the PC expansions, this comes into play when getting
-        # the orthogonal polynomials.
+        # Raw moments of the weibull truncated to [lo, hi] and normalized, the
+        # same distribution that ppf samples from. With lo = 0,
+        # E[x**k] = b**k * gamma(1+k/a) * P(1+k/a, (hi/b)**a) / cdf(hi)
+        # where P is the regularized lower incomplete gamma function.
+        # Raw moments are ill conditioned at high orders, ttr is preferred
+        # for the orthogonal polynomials.
+        a = self.a
+        b = self.b
+        k = np.asarray(k, dtype=float)
+        s = 1. + k/a
+        m_hi = special.gamma(s) * special.gammainc(s, (self.hi/b)**a)
+        m_lo = special.gamma(s) * special.gammainc(s, (self.lo/b)**a)
+        return b**k * (m_hi - m_lo) / (self.cdf(self.hi) - self.cdf(self.lo))
+
+    def ttr(self, k):
+        return _ttr(self, k)
+
+    def _discretize(self, order):
+        # Gauss-Jacobi nodes and weights on [lo, hi] with lo = 0, the factor
+        # x**(a-1) of the pdf is the Jacobi weight and the rest of the pdf is
+        # smooth. Not exact, so twice as many nodes as needed for polynomials.
         a = self.a
         b = self.b
-        return b * special.gamma(1.+k*1./a)
+        nPoints = 2*order + 20
+        t, wt = special.roots_jacobi(nPoints, 0.0, a-1)
+        h = (self.hi - self.lo)/2.
+        x = self.lo + h*(t + 1)
+        w = wt * a/b * (h/b)**(a-1) * h * np.exp(-(x/b)**a)
+        return x, w
 
     def str(self):
         return "weibull(%s, %s)" % (self.a, self.b)
 
+    def key(self):
+        return ('myWeibull', self.a, self.b, self.lo, self.hi)
+
     def bnd(self):
         return (self.lo, self.hi)
 
 
+class windRoseWeibull(object):
+    """Joint wind direction and wind speed distribution.
+
+    The direction follows a tabulated wind rose. In each direction bin the
+    speed follows a Weibull with shape a, with the scale set so that the
+    mean is the average speed of the bin.
+    """
+
+    def __init__(self, inputfile='windrose_amalia_directionally_averaged_speeds.txt', a=1.8, tol=0.0):
+        self.windrose = tabulatedWindRose(inputfile, tol)
+        self.a = a
+        speeds = self.windrose.speeds.copy()
+        # Bins without data get the overall average speed, otherwise the scale is zero
+        speeds[speeds <= 0] = np.sum(self.windrose.p*speeds)
+        self.b = speeds / special.gamma(1. + 1./a)  # scale of each direction bin
+        self.lo = 0.0  # speed bounds
+        self.hi = 30.0
+        # chaospy distribution of the direction, used for the direction points in getPoints
+        self.direction_dist = windRoseDist(self.windrose)
+
+    def _scale(self, direction):
+        windrose = self.windrose
+        direction = np.asarray(direction, dtype=float)
+        k = np.floor((direction - windrose.start)/windrose.step).astype(int) % windrose.nBins
+        return self.b[k]
+
+    def speed_cdf(self, speed, direction):
+        # cdf of the speed conditioned on the direction, broadcasts speed and direction
+        b = self._scale(direction)
+        return 1-np.exp(-(np.asarray(speed, dtype=float)/b)**self.a)
+
+    def speed_pdf(self, speed, direction):
+        a = self.a
+        b = self._scale(direction)
+        x = np.asarray(speed, dtype=float)
+        return a/b * (x/b)**(a-1) * np.exp(-(x/b)**a)
+
+    def speed_ppf(self, q, direction):
+        # Analytic inverse of the conditional cdf truncated to [lo, hi]
+        a = self.a
+        b = self._scale(direction)
+        F_lo = 1-np.exp(-(self.lo/b)**a)
+        F_hi = 1-np.exp(-(self.hi/b)**a)
+        F = np.asarray(q, dtype=float)*(F_hi - F_lo) + F_lo
+        return b * np.power(-np.log1p(-F), 1./a)
+
+    def pdf(self, direction, speed):
+        return self.windrose.pdf(direction).reshape(np.shape(direction)) * self.speed_pdf(speed, direction)
+
+    def str(self):
+        return "Joint %s and weibull(%s)" % (self.windrose.str(), self.a)
+
+    def key(self):
+        return ('windRoseWeibull', self.windrose.key(), self.a, tuple(self.b.tolist()), self.lo, self.hi)
+
+    def bnd(self):
+        return (self.windrose.lo, self.lo), (self.windrose.hi, self.hi)
+
+
+class windRoseDist(cp.Dist):
+    """chaospy distribution of a wind rose object of this module.
+
+    Defined as a class instead of with cp.construct and lambdas, so the
+    distribution can be pickled and sent to other processes.
+    """
+
+    def __init__(self, windrose):
+        self.windrose = windrose  # also gives getPoints the zero probability region
+        cp.Dist.__init__(self)
+
+    def _cdf(self, x):
+        return self.windrose.cdf(x)
+
+    def _bnd(self):
+        return self.windrose.bnd()
+
+    def _pdf(self, x):
+        return self.windrose.pdf(x)
+
+    def _ppf(self, q):
+        return self.windrose.ppf(q)
+
+    def _mom(self, k):
+        return self.windrose.mom(k)
+
+    def _ttr(self, k):
+        return self.windrose.ttr(k)
+
+    def _str(self):
+        return self.windrose.str()
+
+    def key(self):
+        return self.windrose.key()
+
+    def __reduce__(self):
+        # The chaospy graph is rebuilt from the wind rose when unpickling
+        return (self.__class__, (self.windrose,))
+
+
+class weibullDist(cp.Dist):
+    """chaospy distribution of myWeibull, picklable like windRoseDist."""
+
+    def __init__(self, weibull):
+        self.weibull = weibull
+        cp.Dist.__init__(self)
+
+    def _cdf(self, x):
+        return self.weibull.cdf(x)
+
+    def _bnd(self):
+        return self.weibull.bnd()
+
+    def _pdf(self, x):
+        return self.weibull.pdf(x)
+
+    def _ppf(self, q):
+        return self.weibull.ppf(q)
+
+    def _mom(self, k):
+        return self.weibull.mom(k)
+
+    def _ttr(self, k):
+        return self.weibull.ttr(k)
+
+    def _str(self):
+        return self.weibull.str()
+
+    def key(self):
+        return self.weibull.key()
+
+    def __reduce__(self):
+        return (self.__class__, (self.weibull,))
+
+
 def getWeibull():
 
     my_weibull = myWeibull()
-    # Set the necessary functions to construct a chaospy distribution
-    Weibull = cp.construct(
-        cdf=lambda self, x: my_weibull.cdf(x),
-        bnd=lambda self: my_weibull.bnd(),
-        pdf=lambda self, x: my_weibull.pdf(x),
-        mom=lambda self, k: my_weibull.mom(k),
-        str=lambda self: my_weibull.str()
-    )
-
-    weibull_dist = Weibull()
+    weibull_dist = weibullDist(my_weibull)
     return weibull_dist
 
-def getWindRose():
-
-    amalia_wind_rose = amaliaWindRose()
-    # amalia_wind_rose = amaliaWindRoseRaw()  # Using this option needs updating
-
-    # Set the necessary functions to construct a chaospy distribution
-    
-    windRose = cp.construct(
-        cdf=lambda self, x: amalia_wind_rose.cdf(x),
-        bnd=lambda self: amalia_wind_rose.bnd(),
-        pdf=lambda self, x: amalia_wind_rose.pdf(x),
-        str=lambda self: amalia_wind_rose.str()
-    )
-    
-    windrose_dist = windRose()
+
+def getWindRose(raw=False):
+
+    if raw:
+        amalia_wind_rose = amaliaWindRoseRaw()
+    else:
+        amalia_wind_rose = amaliaWindRose()
+
+    windrose_dist = windRoseDist(amalia_wind_rose)
     # print windrose_dist
     # print windrose_dist.pdf(180)
     # print windrose_dist.pdf(365)
     # print windrose_dist.range()
     return windrose_dist
 
+
+def getTabulatedWindRose(inputfile='windrose_amalia_8ms.txt', tol=0.0):
+
+    tabulated_wind_rose = tabulatedWindRose(inputfile, tol)
+    windrose_dist = windRoseDist(tabulated_wind_rose)
+    return windrose_dist
+
+
+def getJointWindRose(inputfile='windrose_amalia_directionally_averaged_speeds.txt', a=1.8, tol=0.0):
+
+    joint_dist = windRoseWeibull(inputfile, a, tol)
+    return joint_dist
+
+
 # amalia_wind_rose = amaliaWindRose()
 # x = np.linspace(-0.5, 0.5, 51)
 # dx = x[1]-x[0]
@@ -8,6 +8,8 @@
 #   getPoints.py params.in results.out
 #   so sys.argv[1] will be the parameters file and
 #   sys.argv[2] will be the results file to return to DAKOTA
+# With the batch keyword of the interface the parameters file holds all the
+#   evaluations, so the whole rule costs one interpreter start
 
 # necessary python modules
 import sys
@@ -21,7 +23,7 @@ def main():
     # Parse DAKOTA parameters file
     # ----------------------------
     paramsfile = sys.argv[1]
-    paramsdict = dakotaInterface.parseDakotaParametersFile(paramsfile)
+    paramsdicts = dakotaInterface.parseDakotaBatchParametersFile(paramsfile)
 
     # -------- Modify here for your problem -------- #
 
@@ -30,9 +32,10 @@ def main():
     # ------------------------
 
     nVarUncertain = 1
-    dakotaInterface.checknVar(nVarUncertain, paramsdict)
+    for paramsdict in paramsdicts:
+        dakotaInterface.checknVar(nVarUncertain, paramsdict)
 
-    active_set_vector = [int(paramsdict['ASV_1:power'])]
+    active_set_vectors = [[int(paramsdict['ASV_1:power'])] for paramsdict in paramsdicts]
 
     # -----------------------------
     # Execute your application
@@ -40,22 +43,22 @@ def main():
 
     try:
         power = np.atleast_1d(np.loadtxt('powerInput.txt'))
-        index = int(paramsdict['eval_id']) - 1
+        index = np.array([dakotaInterface.evalId(paramsdict) for paramsdict in paramsdicts]) - 1
         power_i = power[index]
 
     except IOError:  # This is for the case when we are only getting the sample points.
         print '\n\nWARNING: missing powerInput.txt\n\n'
-        power_i = -1.0  # np.nan
+        power_i = -np.ones(len(paramsdicts))  # np.nan
 
-    resultsdict = {'fns': [power_i], 'fnGrads': []}
+    resultsdicts = [{'fns': [p], 'fnGrads': []} for p in power_i]
 
     # ----------------------------
     # Return the results to DAKOTA
     # ----------------------------
 
     resultsfile = sys.argv[2]
-    dakotaInterface.writeDakotaResultsFile(
-        resultsfile, resultsdict, paramsdict, active_set_vector)
+    dakotaInterface.writeDakotaBatchResultsFile(
+        resultsfile, resultsdicts, paramsdicts, active_set_vectors)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,55 @@
+import numpy as np
+
+
+def jensenPower(turbineX, turbineY, windDirections, windSpeeds, rotorDiameter, axialInduction, Cp,
+                generatorEfficiency, air_density=1.1716, k=0.1):
+    """Farm power with the Jensen wake model, for all the directions at once.
+
+    A cheap model of the farm power, e.g. as the control variate of
+    MultiFidelityStatistics. The wind directions follow the FLORIS
+    convention, 270 is a wind from the west. The wakes have the cosine
+    profile of Jensen, smooth at the wake edges so the power is
+    differentiable in the layout, and their deficits at a turbine are added
+    as the root of the sum of squares.
+
+    Args:
+        turbineX (np.array): turbine positions (m)
+        turbineY (np.array): turbine positions (m)
+        windDirections (np.array): wind direction of each case (deg)
+        windSpeeds (np.array): free stream wind speed of each case (m/s)
+        rotorDiameter (np.array): rotor diameter of each turbine (m)
+        axialInduction (np.array): axial induction of each turbine
+        Cp (np.array): power coefficient of each turbine
+        generatorEfficiency (np.array): generator efficiency of each turbine
+        air_density (float): air density (kg/m^3)
+        k (float): wake expansion coefficient
+
+    Returns:
+        power (np.array): power of the farm for each case (kW)
+
+    """
+
+    windDirections = np.atleast_1d(np.asarray(windDirections, dtype=float))
+    windSpeeds = np.atleast_1d(np.asarray(windSpeeds, dtype=float))
+
+    # Positions in the wind frame, the wind blows along +x
+    windDirectionRad = np.radians((270. - windDirections) % 360.)[:, np.newaxis]
+    turbineXw = turbineX*np.cos(-windDirectionRad) - turbineY*np.sin(-windDirectionRad)
+    turbineYw = turbineX*np.sin(-windDirectionRad) + turbineY*np.cos(-windDirectionRad)
+
+    # Wake of turbine i (axis 1) at turbine j (axis 2)
+    dx = turbineXw[:, np.newaxis, :] - turbineXw[:, :, np.newaxis]
+    dy = turbineYw[:, np.newaxis, :] - turbineYw[:, :, np.newaxis]
+    D = rotorDiameter[np.newaxis, :, np.newaxis]
+    a = axialInduction[np.newaxis, :, np.newaxis]
+    wake_radius = D/2. + k*np.maximum(dx, 0.)
+    in_wake = (dx > 0) & (np.abs(dy) < wake_radius)
+    profile = (1. + np.cos(np.pi*dy/wake_radius))/2.
+    deficit = np.where(in_wake, 2*a*np.power(D/2./wake_radius, 2)*profile, 0.)
+    deficit = np.sqrt(np.sum(deficit**2, axis=1))
+
+    wtVelocity = windSpeeds[:, np.newaxis]*(1. - deficit)
+    area = np.pi*np.power(rotorDiameter/2., 2)
+    wtPower = 0.5*air_density*area*Cp*generatorEfficiency*np.power(wtVelocity, 3)/1000.  # kW
+
+    return np.sum(wtPower, axis=1)
@@ -0,0 +1,302 @@
+import itertools
+import numpy as np
+from scipy import linalg
+
+
+def gaussPieces(edges, nPoints):
+    """Gauss-Legendre nodes and weights on each interval between the edges.
+
+    Exact for polynomials of degree 2*nPoints-1 on every interval.
+
+    Args:
+        edges (np.array): increasing interval boundaries
+        nPoints (int): number of nodes per interval
+
+    Returns:
+        x (np.array): the nodes, interval by interval
+        w (np.array): the weights
+
+    """
+    t, wt = np.polynomial.legendre.leggauss(nPoints)
+    edges = np.asarray(edges, dtype=float)
+    lo = edges[:-1, np.newaxis]
+    hi = edges[1:, np.newaxis]
+    x = (lo+hi)/2. + (hi-lo)/2.*t
+    w = (hi-lo)/2.*wt
+    return x.flatten(), w.flatten()
+
+
+def stieltjes(x, w, order):
+    """Recurrence coefficients of the polynomials orthogonal for a discrete measure.
+
+    The monic polynomials satisfy
+    p_{k+1}(x) = (x - alpha_k) p_k(x) - beta_k p_{k-1}(x).
+    The measure (x, w) is normalized to one, so beta_0 = 1. The Stieltjes
+    procedure is done on the orthonormal polynomials, which stay of order
+    one for high orders.
+
+    Args:
+        x (np.array): nodes of the discrete measure
+        w (np.array): weights of the discrete measure
+        order (int): number of coefficients
+
+    Returns:
+        alpha (np.array): alpha_k for k < order
+        beta (np.array): beta_k for k < order
+
+    """
+    w = w/np.sum(w)
+    alpha = np.zeros(order)
+    beta = np.zeros(order)
+    beta[0] = 1.0
+    q_prev = np.zeros(len(x))
+    q = np.ones(len(x))
+    for k in range(order):
+        alpha[k] = np.sum(w*x*q*q)
+        if k+1 < order:
+            r = (x - alpha[k])*q - np.sqrt(beta[k])*q_prev
+            beta[k+1] = np.sum(w*r*r)
+            q_prev, q = q, r/np.sqrt(beta[k+1])
+    return alpha, beta
+
+
+def golubWelsch(alpha, beta):
+    """Gauss nodes and weights from the recurrence coefficients.
+
+    The nodes are the eigenvalues of the Jacobi matrix and the weights the
+    squared first components of its eigenvectors.
+
+    Args:
+        alpha (np.array): alpha_k, k < n
+        beta (np.array): beta_k, k < n, beta_0 is not used
+
+    Returns:
+        x (np.array): the n nodes in increasing order
+        w (np.array): the weights, they add up to one
+
+    """
+    n = len(alpha)
+    if n == 1:
+        return np.array([alpha[0]], dtype=float), np.ones(1)
+    x, vecs = linalg.eigh_tridiagonal(alpha, np.sqrt(beta[1:n]))
+    w = vecs[0, :]**2
+    w = w/np.sum(w)
+    return x, w
+
+
+def histogramGauss(n, abscissas, ordinates):
+    """Gauss rule for a histogram density, as Dakota's histogram_bin_uncertain.
+
+    The density is constant and proportional to ordinates[i] between
+    abscissas[i] and abscissas[i+1]; a last ordinate of zero, as written by
+    updateDakotaFile, is allowed.
+
+    Args:
+        n (int): number of points, Dakota's quadrature_order
+        abscissas (np.array): the bin edges
+        ordinates (np.array): the density in each bin
+
+    Returns:
+        x (np.array): the n Gauss points in increasing order
+        w (np.array): the weights, they add up to one
+
+    """
+    abscissas = np.asarray(abscissas, dtype=float)
+    f = np.asarray(ordinates, dtype=float)[:len(abscissas)-1]
+    # The density is constant in each bin, so n+1 nodes per bin are exact
+    # for the 2n+1 degree polynomials of the recurrence
+    x, w = gaussPieces(abscissas, n+1)
+    w = w*np.repeat(f, n+1)
+    alpha, beta = stieltjes(x, w, n)
+    return golubWelsch(alpha, beta)
+
+
+def fejer(n):
+    """Fejer's second rule, the Clenshaw-Curtis rule without the end points.
+
+    The rules are nested, the n points are also points of the 2n+1 point
+    rule, so n = 2**l - 1 gives a nested sequence of levels l.
+
+    Args:
+        n (int): number of points
+
+    Returns:
+        x (np.array): the n points in (-1, 1) in increasing order
+        w (np.array): the weights, they add up to 2
+
+    """
+    theta = np.arange(n, 0, -1)*np.pi/(n+1)
+    j = np.arange(1, (n+1)//2+1)
+    s = np.sum(np.sin(np.outer(theta, 2*j-1))/(2*j-1), axis=1)
+    x = np.cos(theta)
+    w = 4./(n+1)*np.sin(theta)*s
+    return x, w
+
+
+def smolyak(rules, level, anisotropy=None):
+    """Sparse grid of one dimensional rules, by the combination technique.
+
+    The grid adds up tensor products of the rules with levels l, with
+    sum(anisotropy*l) <= level*min(anisotropy), each with the coefficient
+    of the combination technique. A dimension with a larger anisotropy
+    gets lower levels. The points shared by several tensor products, all of
+    them for nested rules, are merged.
+
+    Args:
+        rules (list): one callable per dimension, rules[k](l) gives the
+            points and weights of level l = 0, 1, 2, ...
+        level (int): the level of the sparse grid
+        anisotropy (list): the weight of each dimension, all ones by default
+
+    Returns:
+        points (np.array): shape (len(rules), nPoints)
+        weights (np.array): the weights, some can be negative
+
+    """
+    d = len(rules)
+    g = np.ones(d) if anisotropy is None else np.asarray(anisotropy, dtype=float)
+    g = g/np.min(g)
+    eps = 1e-10
+    indices = [l for l in itertools.product(*[range(int(level/gk + eps) + 1) for gk in g])
+               if np.dot(g, l) <= level + eps]
+    index_set = set(indices)
+    shifts = list(itertools.product([0, 1], repeat=d))
+
+    cache = {}  # rule of each dimension and level, used by several tensor products
+    all_points = []
+    all_weights = []
+    for l in indices:
+        c = sum((-1)**sum(z) for z in shifts if tuple(np.add(l, z)) in index_set)
+        if c == 0:
+            continue
+        for k in range(d):
+            if (k, l[k]) not in cache:
+                x, w = rules[k](l[k])
+                cache[(k, l[k])] = (np.asarray(x, dtype=float), np.asarray(w, dtype=float))
+        x = [cache[(k, l[k])][0] for k in range(d)]
+        w = [cache[(k, l[k])][1] for k in range(d)]
+        all_points.append(np.array([xk.flatten() for xk in np.meshgrid(*x, indexing='ij')]))
+        w_tensor = reduce(np.multiply.outer, w)
+        all_weights.append(c*np.ravel(w_tensor))
+
+    # Merge the repeated points
+    points = np.concatenate(all_points, axis=1)
+    weights = np.concatenate(all_weights)
+    _, first, inverse = np.unique(np.round(points, 8), axis=1, return_index=True, return_inverse=True)
+    weights = np.bincount(inverse.flatten(), weights)
+    points = points[:, first]
+    keep = np.abs(weights) > 1e-14*np.max(np.abs(weights))  # weights that cancel out
+    return points[:, keep], weights[keep]
+
+
+# Sobol direction numbers of the dimensions 2 to 6, from Joe and Kuo
+# (new-joe-kuo-6.21201): degree s, coefficients a and initial numbers m
+sobol_params = [(1, 0, [1]), (2, 1, [1, 3]), (3, 1, [1, 3, 1]), (3, 2, [1, 1, 1]), (4, 1, [1, 1, 3, 3])]
+sobol_bits = 30
+
+
+def sobol(n, d, rng=None):
+    """Sobol points in the unit cube, scrambled.
+
+    The scrambling is a random linear matrix scrambling of the direction
+    numbers followed by a random digital shift, as Matousek.
+
+    Args:
+        n (int): number of points, a power of 2 balances them best
+        d (int): dimension, at most 6
+        rng (np.random.RandomState): random generator of the scrambling, no
+            scrambling if None
+
+    Returns:
+        u (np.array): shape (d, n), the points in [0, 1)
+
+    """
+    if d > len(sobol_params) + 1:
+        raise ValueError('Sobol points are available up to dimension %i' % (len(sobol_params) + 1))
+    L = sobol_bits
+    V = np.zeros((d, L), dtype=np.int64)
+    V[0] = 1 << (L - 1 - np.arange(L))  # the van der Corput sequence
+    for j in range(1, d):
+        s, a, m = sobol_params[j-1]
+        v = [m[k] << (L - 1 - k) for k in range(s)]
+        for k in range(s, L):
+            vk = v[k-s] ^ (v[k-s] >> s)
+            for i in range(1, s):
+                vk ^= ((a >> (s - 1 - i)) & 1) * v[k-i]
+            v.append(vk)
+        V[j] = v
+    if rng is not None:
+        # Bit i of the scrambled number is bit i plus a random combination of
+        # the more significant bits, the same for all the direction numbers
+        for j in range(d):
+            V_scrambled = np.zeros(L, dtype=np.int64)
+            for i in range(L):
+                bit = 1 << (L - 1 - i)
+                column = bit | (rng.randint(0, bit) if bit > 1 else 0)
+                V_scrambled ^= ((V[j] & bit) > 0) * column
+            V[j] = V_scrambled
+    index = np.arange(n, dtype=np.int64)
+    X = np.zeros((d, n), dtype=np.int64)
+    for k in range(L):
+        X ^= ((index >> k) & 1)[np.newaxis, :] * V[:, k:k+1]
+    if rng is not None:
+        X ^= rng.randint(0, 1 << L, size=(d, 1)).astype(np.int64)
+    return X / float(1 << L)
+
+
+def halton(n, d, rng=None):
+    """Halton points in the unit cube, scrambled.
+
+    The digits of each dimension are permuted at random, keeping the zero
+    digit, and the points are then shifted at random modulo one.
+
+    Args:
+        n (int): number of points
+        d (int): dimension
+        rng (np.random.RandomState): random generator of the scrambling, no
+            scrambling if None
+
+    Returns:
+        u (np.array): shape (d, n), the points in [0, 1)
+
+    """
+    primes = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37]
+    if d > len(primes):
+        raise ValueError('Halton points are available up to dimension %i' % len(primes))
+    u = np.zeros((d, n))
+    for j in range(d):
+        base = primes[j]
+        index = np.arange(n)
+        factor = 1.0/base
+        while np.any(index > 0):
+            digit = index % base
+            if rng is not None:
+                perm = np.concatenate([[0], 1 + rng.permutation(base - 1)])
+                digit = perm[digit]
+            u[j] += digit*factor
+            index = index // base
+            factor /= base
+    if rng is not None:
+        u = (u + rng.uniform(size=(d, 1))) % 1.0
+    return u
+
+
+def latinHypercube(n, d, rng=None):
+    """Latin hypercube points in the unit cube.
+
+    Each dimension has one point in each of the n equal strata, at a random
+    place in the stratum, and the strata are paired at random.
+
+    Args:
+        n (int): number of points
+        d (int): dimension
+        rng (np.random.RandomState): random generator, np.random if None
+
+    Returns:
+        u (np.array): shape (d, n), the points in [0, 1)
+
+    """
+    if rng is None:
+        rng = np.random.mtrand._rand
+    strata = np.array([rng.permutation(n) for j in range(d)]).reshape(d, n)
+    return (strata + rng.uniform(size=(d, n)))/n
@@ -3,6 +3,12 @@ import numpy as np
 import os
 import chaospy as cp
 from getSamplePoints import getSamplePoints
+from cache import LRUCache, DiskCache, hashKey, keyFields, getCached
+import windfarm_setup
+from jensen import jensenPower
+
+# Orthogonal polynomials and norms shared by all the ChaospyStatistics in the process
+basis_cache = LRUCache(maxsize=16)
 
 
 class DakotaStatistics(ExternalCode):
@@ -104,13 +110,11 @@ class ChaospyStatistics(Component):
         # else:
         #     points, weights = quadrature_rules.rectangle(n, method_dict['distribution'])
 
-        poly = cp.orth_chol(n-1, dist)
-        # poly = cp.orth_bert(n-1, dist)
+        # The basis only depends on the distribution and the order, get it from the cache
+        orth_method = method_dict.get('orth_method', 'chol')
+        poly, norms = getOrthPoly(dist, n-1, orth_method, method_dict.get('cache_dir'))
         # double check this is giving me good orthogonal polynomials.
         # print poly, '\n'
-        p2 = cp.outer(poly, poly)
-        # print 'chol', cp.E(p2, dist)
-        norms = np.diagonal(cp.E(p2, dist))
         print 'diag', norms
 
         expansion, coeff = cp.fit_quadrature(poly, points, weights, power, retall=True, norms=norms)
@@ -195,6 +199,775 @@ class RectStatistics(Component):
         return J
 
 
+class FourierStatistics(Component):
+    """Use the Fourier interpolation of the power to estimate the statistics.
+
+    The power at the equispaced directions of the periodic method is
+    interpolated with its FFT on a fine grid of directions, where the
+    probability of each fine bin comes from the cdf of the wind rose. For a
+    smooth power the interpolation converges much faster than the rules, and
+    the statistics are linear (mean) in the power, so the derivatives are exact.
+    """
+
+    def __init__(self, nDirections=10, method_dict=None):
+
+        super(FourierStatistics, self).__init__()
+
+        # set finite difference options (fd used for testing only)
+        # self.fd_options['force_fd'] = True
+        self.fd_options['form'] = 'central'
+        self.fd_options['step_size'] = 1.0e-5
+        self.fd_options['step_type'] = 'relative'
+
+        # define inputs
+        self.add_param('power', np.zeros(nDirections), units ='kW',
+                       desc='vector containing the power production at each wind direction ccw from north')
+        self.add_param('method_dict', method_dict,
+                       desc='parameters for the UQ method')
+
+        # define output
+        self.add_output('mean', val=0.0, units='kWh', desc='mean annual energy output of wind farm')
+        self.add_output('std', val=0.0, units='kWh', desc='std of energy output of wind farm')
+
+        # The interpolation only depends on the directions, not on the power
+        self.T, self.fine_weights = getFourierInterpolation(method_dict, nDirections)
+
+    def solve_nonlinear(self, params, unknowns, resids):
+
+        power = params['power']
+        T = self.T
+        w = self.fine_weights
+
+        power_fine = np.dot(T, power)
+        mean = np.sum(power_fine*w)
+        var = np.sum(np.power(power_fine - mean, 2) * w)
+        std = np.sqrt(var)
+
+        # number of hours in a year
+        hours = 8760.0
+        # promote statistics to class attribute
+        unknowns['mean'] = mean*hours
+        unknowns['std'] = std*hours
+
+        print 'In FourierStatistics'
+
+    def linearize(self, params, unknowns, resids):
+
+        power = params['power']
+        T = self.T
+        w = self.fine_weights
+
+        power_fine = np.dot(T, power)
+        mean = np.sum(power_fine*w)
+        dev = power_fine - mean
+        std = np.sqrt(np.sum(np.power(dev, 2) * w))
+        dvar_dfine = 2*w*dev - 2*np.sum(w*dev)*w
+
+        # number of hours in a year
+        hours = 8760.0
+        J = {}
+        J[('mean', 'power')] = np.array([np.dot(w, T)*hours])
+        if std > 0:
+            J[('std', 'power')] = np.array([np.dot(dvar_dfine, T)/(2*std)*hours])
+        else:
+            J[('std', 'power')] = np.zeros((1, len(power)))
+        return J
+
+
+class HermiteStatistics(Component):
+    """Use the power and its direction derivative to estimate the statistics.
+
+    The power is interpolated between the directions of the hermite method
+    with piecewise cubic Hermite polynomials (windfarm_setup.getHermiteInterpolation),
+    which use the derivative of the power with respect to the wind direction
+    at each direction, dpower_ddirection in kW/deg. The derivatives are an
+    input set by the caller, so the gradient of the statistics with respect
+    to the layout misses the change of the derivatives with the layout, and
+    AEPGroup refuses the method when the layout is optimized.
+    """
+
+    def __init__(self, nDirections=10, method_dict=None):
+
+        super(HermiteStatistics, self).__init__()
+
+        # set finite difference options (fd used for testing only)
+        # self.fd_options['force_fd'] = True
+        self.fd_options['form'] = 'central'
+        self.fd_options['step_size'] = 1.0e-5
+        self.fd_options['step_type'] = 'relative'
+
+        # define inputs
+        self.add_param('power', np.zeros(nDirections), units ='kW',
+                       desc='vector containing the power production at each wind direction ccw from north')
+        self.add_param('dpower_ddirection', np.zeros(nDirections), units ='kW/deg',
+                       desc='vector containing the derivative of the power with respect to each wind direction')
+        self.add_param('method_dict', method_dict,
+                       desc='parameters for the UQ method')
+
+        # define output
+        self.add_output('mean', val=0.0, units='kWh', desc='mean annual energy output of wind farm')
+        self.add_output('std', val=0.0, units='kWh', desc='std of energy output of wind farm')
+
+        # The interpolation only depends on the directions, not on the power
+        self.B_val, self.B_der, self.fine_weights = windfarm_setup.getHermiteInterpolation(method_dict, nDirections)
+
+    def solve_nonlinear(self, params, unknowns, resids):
+
+        mean, std = hermiteStatistics(params['power'], params['dpower_ddirection'],
+                                      self.B_val, self.B_der, self.fine_weights)
+
+        # number of hours in a year
+        hours = 8760.0
+        # promote statistics to class attribute
+        unknowns['mean'] = mean*hours
+        unknowns['std'] = std*hours
+
+        print 'In HermiteStatistics'
+
+    def linearize(self, params, unknowns, resids):
+
+        B_val = self.B_val
+        B_der = self.B_der
+        w = self.fine_weights
+
+        power_fine = np.dot(B_val, params['power']) + np.dot(B_der, params['dpower_ddirection'])
+        mean = np.sum(power_fine*w)
+        dev = power_fine - mean
+        std = np.sqrt(np.sum(np.power(dev, 2) * w))
+        dstd_dfine = (w*dev - np.sum(w*dev)*w)/std if std > 0 else np.zeros(len(w))
+
+        # number of hours in a year
+        hours = 8760.0
+        J = {}
+        J[('mean', 'power')] = np.array([np.dot(w, B_val)*hours])
+        J[('mean', 'dpower_ddirection')] = np.array([np.dot(w, B_der)*hours])
+        J[('std', 'power')] = np.array([np.dot(dstd_dfine, B_val)*hours])
+        J[('std', 'dpower_ddirection')] = np.array([np.dot(dstd_dfine, B_der)*hours])
+        return J
+
+
+def hermiteStatistics(power, dpower, B_val, B_der, w):
+    """Mean and std of the Hermite interpolation of the power, per hour."""
+
+    power_fine = np.dot(B_val, power) + np.dot(B_der, dpower)
+    mean = np.sum(power_fine*w)
+    var = np.sum(np.power(power_fine - mean, 2) * w)
+    return mean, np.sqrt(var)
+
+
+class RichardsonStatistics(Component):
+    """Use Richardson extrapolation of the rectangle integration to estimate the statistics.
+
+    The points are those of the rect-extrapolated method, the rect rule of
+    n bins with each bin split in three. The rule with the n bins uses the
+    middle point of each triplet and the sum of its weights, and the rule
+    with n/3 bins the middle point of each triplet of triplets. The error of
+    the midpoint rule goes as 1/n**2 for a smooth integrand, and then the
+    mean and the variance are extrapolated as (9*fine - coarse)/8. The
+    direction rule loses probability around the zero probability region
+    (modifyx) and the power has kinks, which can spoil the 1/n**2 error, so
+    each statistic is only extrapolated if the order estimated from the
+    three rules is between 1.5 and 2.5, else it is the one of the fine rule.
+    """
+
+    def __init__(self, nDirections=36, method_dict=None):
+
+        super(RichardsonStatistics, self).__init__()
+
+        # set finite difference options (fd used for testing only)
+        # self.fd_options['force_fd'] = True
+        self.fd_options['form'] = 'central'
+        self.fd_options['step_size'] = 1.0e-5
+        self.fd_options['step_type'] = 'relative'
+
+        if nDirections % 9 != 0:
+            raise ValueError('the rect-extrapolated method needs a multiple of 9 points (n a multiple of 3), not %i' % nDirections)
+
+        # define inputs
+        self.add_param('power', np.zeros(nDirections), units ='kW',
+                       desc='vector containing the power production for each winddirection and windspeed pair')
+        self.add_param('method_dict', method_dict,
+                       desc='parameters for the UQ method')
+        self.add_param('weights', np.zeros(nDirections),
+                       desc='vector containing the integration weight associated with each power')
+
+        # define output
+        self.add_output('mean', val=0.0, units='kWh', desc='mean annual energy output of wind farm')
+        self.add_output('std', val=0.0, units='kWh', desc='std of energy output of wind farm')
+
+    def getWeights(self, weights):
+        # Weights of the fine, coarse and coarsest rules on all the points,
+        # the coarser rules are zero outside of their middle points
+        n = len(weights)//3
+        w_coarse = np.zeros(3*n)
+        w_coarse[1::3] = weights.reshape(n, 3).sum(axis=1)
+        w_coarsest = np.zeros(3*n)
+        w_coarsest[4::9] = weights.reshape(n//3, 9).sum(axis=1)
+        return weights, w_coarse, w_coarsest
+
+    def getStatistics(self, power, weights):
+        # The mean and variance of each rule, and the coefficients of the fine
+        # and coarse rules in the estimate of each of them
+        rules = self.getWeights(weights)
+        means = [np.sum(power*w) for w in rules]
+        variances = [np.sum(np.power(power - m, 2) * w) for m, w in zip(means, rules)]
+        return rules, means, variances, extrapolation(means), extrapolation(variances)
+
+    def solve_nonlinear(self, params, unknowns, resids):
+
+        power = params['power']
+        rules, means, variances, c_mean, c_var = self.getStatistics(power, params['weights'])
+
+        mean = c_mean[0]*means[0] + c_mean[1]*means[1]
+        var = max(c_var[0]*variances[0] + c_var[1]*variances[1], 0.0)  # the extrapolation could make it negative
+        std = np.sqrt(var)
+
+        # number of hours in a year
+        hours = 8760.0
+        # promote statistics to class attribute
+        unknowns['mean'] = mean*hours
+        unknowns['std'] = std*hours
+
+        print 'In RichardsonStatistics, extrapolated mean %s, variance %s' % (c_mean[1] != 0, c_var[1] != 0)
+
+    def linearize(self, params, unknowns, resids):
+
+        # The choice to extrapolate or not is kept fixed
+        power = params['power']
+        rules, means, variances, c_mean, c_var = self.getStatistics(power, params['weights'])
+        w_fine, w_coarse = rules[:2]
+
+        # d var / d power of a weighted rule
+        def dvar(w):
+            dev = power - np.sum(power*w)
+            return 2*w*dev - 2*np.sum(w*dev)*w
+
+        var = c_var[0]*variances[0] + c_var[1]*variances[1]
+
+        # number of hours in a year
+        hours = 8760.0
+        J = {}
+        J[('mean', 'power')] = np.array([(c_mean[0]*w_fine + c_mean[1]*w_coarse)*hours])
+        if var > 0:
+            J[('std', 'power')] = np.array([(c_var[0]*dvar(w_fine) + c_var[1]*dvar(w_coarse))/(2*np.sqrt(var))*hours])
+        else:
+            J[('std', 'power')] = np.zeros((1, len(power)))
+        return J
+
+
+def extrapolation(q):
+    """Coefficients of the fine and coarse values in the Richardson estimate.
+
+    Args:
+        q (list): a statistic from the fine, coarse and coarsest rules, each
+            with three times fewer bins than the previous one
+
+    Returns:
+        c (tuple): (9/8, -1/8) if the order estimated from the three values
+            is about 2, else (1, 0), the fine value
+
+    """
+
+    diff_fine = q[1] - q[0]
+    diff_coarse = q[2] - q[1]
+    if diff_fine == 0 or diff_coarse/diff_fine <= 0:
+        return 1.0, 0.0
+    order = np.log(diff_coarse/diff_fine)/np.log(3.)
+    if abs(order - 2) > 0.5:
+        return 1.0, 0.0
+    return 9/8., -1/8.
+
+
+class MultiFidelityStatistics(Component):
+    """Use the Jensen wake model as a control variate to estimate the statistics.
+
+    The power of the full model at the n points of the rule is corrected
+    with the cheap Jensen model (jensen.jensenPower) at the same points and
+    at method_dict['cheap_n'] points of the same method,
+    mean = sum(w*P) + alpha*(sum(W*C_cheap) - sum(w*C)),
+    and the same for the second moment with its own coefficient,
+    E[P**2] = sum(w*P**2) + alpha2*(sum(W*C_cheap**2) - sum(w*C**2)), so
+    var = E[P**2] - mean**2. The coefficients are 1 by default, the two
+    level estimate, or, with method_dict['cv_alpha'] = 'optimal', the
+    weighted regression coefficients of P on C and of P**2 on C**2 at the n
+    points. If the corrected variance is negative, the variance is the one
+    of the n points without correction. For the sampling methods,
+    mean_variance is the weighted variance of P - alpha*C over the
+    effective number of points, a heuristic that treats the points as
+    random, it is zero for the quadrature rules.
+    """
+
+    def __init__(self, nTurbines, nDirections=10, method_dict=None):
+
+        super(MultiFidelityStatistics, self).__init__()
+
+        # set finite difference options (fd used for testing only)
+        # self.fd_options['force_fd'] = True
+        self.fd_options['form'] = 'central'
+        self.fd_options['step_size'] = 1.0e-5
+        self.fd_options['step_type'] = 'relative'
+
+        # define inputs
+        self.add_param('power', np.zeros(nDirections), units ='kW',
+                       desc='vector containing the power production for each winddirection and windspeed pair')
+        self.add_param('method_dict', method_dict,
+                       desc='parameters for the UQ method')
+        self.add_param('weights', np.zeros(nDirections),
+                       desc='vector containing the integration weight associated with each power')
+        self.add_param('windDirections', np.zeros(nDirections), units='deg')
+        self.add_param('windSpeeds', np.zeros(nDirections), units='m/s')
+        self.add_param('turbineX', np.zeros(nTurbines), units='m')
+        self.add_param('turbineY', np.zeros(nTurbines), units='m')
+        self.add_param('rotorDiameter', np.zeros(nTurbines), units='m')
+        self.add_param('axialInduction', np.zeros(nTurbines))
+        self.add_param('generatorEfficiency', np.zeros(nTurbines))
+        self.add_param('air_density', val=1.1716, units='kg/(m*m*m)')
+        self.add_param('Cp_in', np.zeros(nTurbines))
+
+        # define output
+        self.add_output('mean', val=0.0, units='kWh', desc='mean annual energy output of wind farm')
+        self.add_output('std', val=0.0, units='kWh', desc='std of energy output of wind farm')
+        self.add_output('mean_variance', val=0.0, units='kWh*kWh',
+                        desc='heuristic variance of the estimate of the mean, for the sampling methods')
+
+        # The cheap model points, the same method with more points
+        if method_dict['method'] == 'dakota':
+            raise ValueError('the dakota method rewrites its input file, use another method for the cheap points')
+        points, weights = windfarm_setup.getPoints(method_dict, method_dict.get('cheap_n', 10*nDirections))
+        self.cheap_speeds, self.cheap_directions = windfarm_setup.getWindConditions(method_dict, points)
+        self.cheap_weights = weights
+        assert self.cheap_directions.shape == self.cheap_speeds.shape == self.cheap_weights.shape, \
+            'the cheap points and weights do not match'
+
+    def cheapPower(self, params, turbineX, turbineY):
+        # Jensen power at the points of the rule and at the cheap points
+        args = (params['rotorDiameter'], params['axialInduction'], params['Cp_in'],
+                params['generatorEfficiency'], params['air_density'])
+        # The Jensen model must be evaluated at the nodes of the full model power
+        assert params['windDirections'].shape == params['windSpeeds'].shape == params['power'].shape \
+            == params['weights'].shape, 'the wind conditions, power and weights do not match'
+        C = jensenPower(turbineX, turbineY, params['windDirections'], params['windSpeeds'], *args)
+        C_cheap = jensenPower(turbineX, turbineY, self.cheap_directions, self.cheap_speeds, *args)
+        return C, C_cheap
+
+    def getStatistics(self, params, C, C_cheap):
+
+        P = params['power']
+        w = params['weights']
+        W = self.cheap_weights
+
+        alpha = params['method_dict'].get('cv_alpha', 1.0)
+        optimal = alpha == 'optimal'
+        if optimal:
+            alpha = controlCoefficient(P, C, w)
+            alpha2 = controlCoefficient(P**2, C**2, w)
+        else:
+            alpha2 = alpha
+
+        mean = np.sum(w*P) + alpha*(np.sum(W*C_cheap) - np.sum(w*C))
+        moment2 = np.sum(w*P**2) + alpha2*(np.sum(W*C_cheap**2) - np.sum(w*C**2))
+        var = moment2 - mean**2
+        if var < 0:  # the correction failed, the cheap model is too far from the power
+            print 'MultiFidelityStatistics: negative corrected variance, using the uncorrected one'
+            P_avg = np.sum(w*P)/np.sum(w)
+            var = np.sum(w*(P - P_avg)**2)
+
+        # Variance of the estimate from the residual P - alpha*C, as for random points
+        mean_variance = 0.0
+        if params['method_dict']['method'] in windfarm_setup.sampling_methods:
+            R = P - alpha*C
+            R_avg = np.sum(w*R)/np.sum(w)
+            n_eff = np.sum(w)**2/np.sum(w**2)
+            mean_variance = np.sum(w*(R - R_avg)**2)/np.sum(w)/n_eff
+
+        return mean, np.sqrt(var), mean_variance, alpha
+
+    def solve_nonlinear(self, params, unknowns, resids):
+
+        C, C_cheap = self.cheapPower(params, params['turbineX'], params['turbineY'])
+        mean, std, mean_variance, alpha = self.getStatistics(params, C, C_cheap)
+
+        # number of hours in a year
+        hours = 8760.0
+        # promote statistics to class attribute
+        unknowns['mean'] = mean*hours
+        unknowns['std'] = std*hours
+        unknowns['mean_variance'] = mean_variance*hours**2
+
+        print 'In MultiFidelityStatistics, alpha = ', alpha
+
+    def linearize(self, params, unknowns, resids):
+
+        P = params['power']
+        w = params['weights']
+        turbineX = params['turbineX']
+        turbineY = params['turbineY']
+        C, C_cheap = self.cheapPower(params, turbineX, turbineY)
+        mean, std, mean_variance, alpha = self.getStatistics(params, C, C_cheap)
+
+        # number of hours in a year
+        hours = 8760.0
+        dmean_dpower = w
+        if params['method_dict'].get('cv_alpha', 1.0) == 'optimal':
+            # alpha depends on the power through the covariance
+            C_avg, var_C = weightedVariance(C, w)
+            if var_C > 0:
+                dmean_dpower = dmean_dpower + (np.sum(self.cheap_weights*C_cheap) - np.sum(w*C))*w*(C - C_avg)/var_C
+
+        J = {}
+        J[('mean', 'power')] = np.array([dmean_dpower*hours])
+
+        # The cheap model depends on the layout, the derivatives of the Jensen
+        # terms are central finite differences, not analytic
+        for name, x in [('turbineX', turbineX), ('turbineY', turbineY)]:
+            dmean = np.zeros(len(x))
+            for i in range(len(x)):
+                h = 1.0e-3*max(abs(x[i]), 1.0)
+                xp = x.copy()
+                xp[i] += h
+                xm = x.copy()
+                xm[i] -= h
+                if name == 'turbineX':
+                    mean_p = self.getStatistics(params, *self.cheapPower(params, xp, turbineY))[0]
+                    mean_m = self.getStatistics(params, *self.cheapPower(params, xm, turbineY))[0]
+                else:
+                    mean_p = self.getStatistics(params, *self.cheapPower(params, turbineX, xp))[0]
+                    mean_m = self.getStatistics(params, *self.cheapPower(params, turbineX, xm))[0]
+                dmean[i] = (mean_p - mean_m)/(2*h)
+            J[('mean', name)] = np.array([dmean*hours])
+
+        return J
+
+
+class RegressionStatistics(Component):
+    """Fit a polynomial chaos expansion to the power by regression.
+
+    The power at the n points of a QMC design, the regression method of
+    windfarm_setup.getPoints, is fitted with the basis of getRegressionBasis,
+    by least squares with the order chosen by leave-one-out cross
+    validation, or by orthogonal matching pursuit if
+    method_dict['regression'] = 'omp', which keeps the terms that give the
+    smallest leave-one-out error. The basis is not orthogonal for the
+    distribution, the mean and variance of the expansion come from the
+    moments of the basis on a fine rect rule of method_dict['reference_n']
+    points, 3600 by default, or (360, 60) for a joint distribution.
+    """
+
+    def __init__(self, nDirections=10, method_dict=None):
+
+        super(RegressionStatistics, self).__init__()
+
+        # set finite difference options (fd used for testing only)
+        # self.fd_options['force_fd'] = True
+        self.fd_options['form'] = 'central'
+        self.fd_options['step_size'] = 1.0e-5
+        self.fd_options['step_type'] = 'relative'
+
+        # define inputs
+        self.add_param('power', np.zeros(nDirections), units ='kW',
+                       desc='vector containing the power production for each winddirection and windspeed pair')
+        self.add_param('method_dict', method_dict,
+                       desc='parameters for the UQ method')
+        self.add_param('windDirections', np.zeros(nDirections), units='deg')
+        self.add_param('windSpeeds', np.zeros(nDirections), units='m/s')
+
+        # define output
+        self.add_output('mean', val=0.0, units='kWh', desc='mean annual energy output of wind farm')
+        self.add_output('std', val=0.0, units='kWh', desc='std of energy output of wind farm')
+        self.add_output('loo_error', val=0.0, desc='leave-one-out error of the fit relative to the power variance')
+
+        # The largest order with fewer terms than points
+        self.order = method_dict.get('max_order', 20)
+        while self.order > 0 and len(getRegressionBasis(method_dict, [0.], [0.], self.order)[1]) >= nDirections:
+            self.order -= 1
+
+        # Moments of the basis on the reference rule
+        dist = method_dict['distribution']
+        joint = getattr(dist, 'direction_dist', None) is not None
+        method_dict_ref = dict(method_dict)
+        method_dict_ref['method'] = 'rect'
+        method_dict_ref['offset'] = 0
+        method_dict_ref.setdefault('Noffset', 10)
+        points, weights = windfarm_setup.getPoints(method_dict_ref, method_dict.get('reference_n', (360, 60) if joint else 3600))
+        speeds, directions = windfarm_setup.getWindConditions(method_dict, points)
+        Phi, self.degree = getRegressionBasis(method_dict, directions, speeds, self.order)
+        self.E = np.dot(weights, Phi)
+        self.G = np.dot(Phi.T, weights[:, np.newaxis]*Phi)
+
+    def fit(self, params):
+        # The terms of the expansion and the pseudo-inverse that gives their coefficients
+        method_dict = params['method_dict']
+        Phi = getRegressionBasis(method_dict, params['windDirections'], params['windSpeeds'], self.order)[0]
+        terms, loo = selectTerms(Phi, self.degree, params['power'], method_dict.get('regression', 'lstsq'))
+        return terms, np.linalg.pinv(Phi[:, terms]), loo
+
+    def solve_nonlinear(self, params, unknowns, resids):
+
+        power = params['power']
+        terms, A, loo = self.fit(params)
+        c = np.dot(A, power)
+        E = self.E[terms]
+        G = self.G[np.ix_(terms, terms)]
+
+        mean = np.dot(E, c)
+        std = np.sqrt(max(np.dot(c, np.dot(G, c)) - mean**2, 0.0))
+
+        # number of hours in a year
+        hours = 8760.0
+        # promote statistics to class attribute
+        unknowns['mean'] = mean*hours
+        unknowns['std'] = std*hours
+        var = np.var(power)
+        unknowns['loo_error'] = loo/var if var > 0 else 0.0
+
+        print 'In RegressionStatistics, %i terms of order %i' % (len(terms), np.max(self.degree[terms]))
+
+    def linearize(self, params, unknowns, resids):
+
+        # The terms are kept fixed, the coefficients are linear in the power
+        power = params['power']
+        terms, A, loo = self.fit(params)
+        c = np.dot(A, power)
+        E = self.E[terms]
+        G = self.G[np.ix_(terms, terms)]
+        mean = np.dot(E, c)
+        std = np.sqrt(max(np.dot(c, np.dot(G, c)) - mean**2, 0.0))
+
+        # number of hours in a year
+        hours = 8760.0
+        J = {}
+        J[('mean', 'power')] = np.array([np.dot(E, A)*hours])
+        if std > 0:
+            J[('std', 'power')] = np.array([np.dot(np.dot(G, c) - mean*E, A)/std*hours])
+        else:
+            J[('std', 'power')] = np.zeros((1, len(power)))
+        return J
+
+
+def getRegressionBasis(method_dict, windDirections, windSpeeds, order):
+    """Basis of the regression expansion, of total degree up to order.
+
+    The direction terms are cos(k*theta) and sin(k*theta) of degree k, the
+    power is periodic in the direction, and the speed terms are the Legendre
+    polynomials between the speed bounds. For a joint distribution the
+    terms are the products of a direction and a speed term.
+
+    Args:
+        method_dict (dict): the 'uncertain_var' and the 'distribution'
+        windDirections (np.array): the directions of the points (deg)
+        windSpeeds (np.array): the speeds of the points (m/s)
+        order (int): the largest total degree
+
+    Returns:
+        Phi (np.array): shape (nPoints, nTerms), the terms at the points
+        degree (np.array): the total degree of each term
+
+    """
+
+    uncertain_var = method_dict['uncertain_var']
+    dist = method_dict['distribution']
+    theta = np.radians(np.asarray(windDirections, dtype=float))
+    columns = []
+    degree = []
+
+    if uncertain_var in ['speed', 'joint']:
+        if uncertain_var == 'joint':
+            a, b = dist.lo, dist.hi
+        else:
+            bnd = dist.range()
+            a, b = bnd[0][0], bnd[1][0]
+        t = 2*(np.asarray(windSpeeds, dtype=float) - a)/(b - a) - 1
+        speed_terms = [np.polynomial.legendre.legval(t, np.eye(order+1)[k]) for k in range(order+1)]
+    else:
+        speed_terms = [np.ones(len(theta))]
+
+    if uncertain_var in ['direction', 'joint']:
+        direction_terms = [(0, np.ones(len(theta)))]
+        for k in range(1, order+1):
+            direction_terms += [(k, np.cos(k*theta)), (k, np.sin(k*theta))]
+    else:
+        direction_terms = [(0, np.ones(len(theta)))]
+
+    for kd, d in direction_terms:
+        for ks, s in enumerate(speed_terms):
+            if kd + ks <= order:
+                columns.append(d*s)
+                degree.append(kd + ks)
+
+    # Sort by degree, the lower orders are the first terms
+    index = np.argsort(degree, kind='mergesort')
+    return np.array(columns)[index].T, np.array(degree)[index]
+
+
+def selectTerms(Phi, degree, power, method='lstsq'):
+    """Terms of the regression expansion with the smallest leave-one-out error.
+
+    The leave-one-out residuals of a least squares fit are
+    r_i/(1 - h_ii), h the diagonal of the hat matrix, so the error of every
+    candidate comes from one fit with all the points.
+
+    Args:
+        Phi (np.array): shape (nPoints, nTerms), the terms at the points
+        degree (np.array): the total degree of each term
+        power (np.array): the power at the points
+        method (string): 'lstsq', the terms up to the best order, or 'omp',
+            orthogonal matching pursuit
+
+    Returns:
+        terms (np.array): indices of the selected terms
+        loo (float): mean squared leave-one-out residual of the selection
+
+    """
+
+    def looError(terms):
+        Q, R = np.linalg.qr(Phi[:, terms])
+        r = power - np.dot(Q, np.dot(Q.T, power))
+        h = np.sum(Q**2, axis=1)
+        if np.any(h > 1 - 1e-10):
+            return np.inf
+        return np.mean((r/(1 - h))**2)
+
+    if method == 'lstsq':
+        candidates = [np.nonzero(degree <= k)[0] for k in range(np.max(degree)+1)]
+    elif method == 'omp':
+        # Add the term most correlated with the residual, starting from the constant
+        scale = np.sqrt(np.sum(Phi**2, axis=0))
+        terms = [0]
+        candidates = [np.array(terms)]
+        for i in range(1, min(Phi.shape[1], len(power)-1)):
+            Q, R = np.linalg.qr(Phi[:, terms])
+            r = power - np.dot(Q, np.dot(Q.T, power))
+            correlation = np.abs(np.dot(Phi.T, r))/scale
+            correlation[terms] = -1
+            terms.append(np.argmax(correlation))
+            candidates.append(np.array(terms))
+    else:
+        raise ValueError('unknown regression method "%s", valid options "lstsq" or "omp"' % method)
+
+    errors = [looError(terms) for terms in candidates]
+    best = np.argmin(errors)
+    return candidates[best], errors[best]
+
+
+def controlCoefficient(P, C, w):
+    """Weighted regression coefficient of P on C, the optimal control variate coefficient."""
+
+    P_avg = np.sum(w*P)/np.sum(w)
+    C_avg, var_C = weightedVariance(C, w)
+    return np.sum(w*(P - P_avg)*(C - C_avg))/var_C if var_C > 0 else 0.0
+
+
+def weightedVariance(C, w):
+    """Weighted mean and variance of C, the variance is 0 if C is nearly constant."""
+
+    C_avg = np.sum(w*C)/np.sum(w)
+    var_C = np.sum(w*(C - C_avg)**2)
+    if var_C <= 1e-12*np.sum(w)*max(C_avg**2, 1.0):  # round off of a constant C
+        var_C = 0.0
+    return C_avg, var_C
+
+
+def getFourierInterpolation(method_dict, n):
+    """Fourier interpolation matrix and fine bin probabilities of the periodic method.
+
+    Args:
+        method_dict (dict): the direction 'distribution', the 'rotation' of
+            the directions and the number of fine directions
+            'fourier_points', 3600 by default
+        n (int): number of directions
+
+    Returns:
+        T (np.array): shape (nFine, n), the interpolated power at the fine
+            directions is np.dot(T, power)
+        w (np.array): the probability of the bin of each fine direction
+
+    """
+
+    dist = method_dict['distribution']
+    x = windfarm_setup.getPeriodicNodes(method_dict, n)
+    bnd = dist.range()
+    r = bnd[1][0] - bnd[0][0]
+    M = max(method_dict.get('fourier_points', 3600), 2*n)
+    dx = r/float(M)
+    x_fine = bnd[0][0] + (x[0] - bnd[0][0] + dx*np.arange(M)) % r
+    w = windfarm_setup.getWeights(x_fine, dx, dist)
+
+    # The interpolant of each unit power vector, zero padding of its FFT
+    c = np.fft.rfft(np.eye(n), axis=0)
+    if n % 2 == 0:
+        c[n//2] *= 0.5  # the Nyquist frequency is split between +n/2 and -n/2
+    T = np.fft.irfft(c, M, axis=0)*M/float(n)
+
+    return T, w
+
+
+def getOrthPoly(dist, order, method='chol', cache_dir=None):
+    """Orthogonal polynomials and their norms for a distribution, cached.
+
+    The result is kept in basis_cache, and in cache_dir if given, keyed by
+    the key() fields of the distribution, the order and the method, so it is
+    computed once instead of once per solve.
+
+    Args:
+        dist: a chaospy distribution from distributions.py, with a key()
+        order (int): order of the polynomial expansion
+        method (string): 'chol', 'ttr', 'bert' or 'gs', the cp.orth_* function
+        cache_dir (string): optional directory of the on disk cache
+
+    Returns:
+        poly (cp.Poly): the orthogonal polynomials
+        norms (np.array): E[poly_i**2] for each polynomial
+
+    """
+
+    orth = getattr(cp, 'orth_' + method, None)
+    if orth is None:
+        raise ValueError('unknown orthogonal polynomial method "%s", valid options "chol", "ttr", "bert" or "gs"' % method)
+
+    def compute():
+        poly = orth(order, dist)
+        p2 = cp.outer(poly, poly)
+        norms = np.diagonal(cp.E(p2, dist))
+        return poly, norms
+
+    key = hashKey('orth', keyFields(dist), order, method)
+    disk = DiskCache(cache_dir) if cache_dir is not None else None
+    return getCached(key, compute, basis_cache, disk)
+
+
+class SymmetryMap(Component):
+    """Power of all the directions from the power of the evaluated directions.
+
+    For a symmetric layout, AEPGroup only evaluates the directions of the
+    fundamental sector, symmetry_map[i] is the evaluated direction with the
+    same power as the direction i.
+    """
+
+    def __init__(self, symmetry_map):
+
+        super(SymmetryMap, self).__init__()
+
+        self.symmetry_map = np.asarray(symmetry_map, dtype=int)
+        nDirections = len(self.symmetry_map)
+        nEval = int(np.max(self.symmetry_map)) + 1
+
+        self.add_param('powerEval', np.zeros(nEval), units='kW',
+                       desc='vector containing the power production of each evaluated direction')
+        self.add_output('power', np.zeros(nDirections), units='kW',
+                        desc='vector containing the power production of each direction')
+
+    def solve_nonlinear(self, params, unknowns, resids):
+
+        unknowns['power'] = params['powerEval'][self.symmetry_map]
+
+    def linearize(self, params, unknowns, resids):
+
+        nEval = len(params['powerEval'])
+        J = {}
+        J[('power', 'powerEval')] = np.eye(nEval)[self.symmetry_map]
+        return J
+
+
 def linearize_function(params):
 
     weights = params['weights']
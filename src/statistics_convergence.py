@@ -13,8 +13,15 @@ def run(method_dict):
     """
     method_dict = {}
     keys of method_dict:
-        'method' = 'dakota', 'rect' or 'chaospy'  # 'chaospy needs updating
-        'uncertain_var' = 'speed' or 'direction'
+        'method' = 'dakota', 'rect', 'fejer' or 'chaospy'  # 'chaospy needs updating
+                   or 'sparse' for 'joint', then the n of getPoints is the level
+                   or the sampling methods 'sobol', 'halton' or 'lhs'
+        'replicate' = seed of the scrambling of the sampling methods
+        'pilot' = (directions, power) of a pilot pass for the 'importance' method
+        'prune_tol' = AEP (kWh) that the dropped points of pruneNodes can change, with
+        'rated_power' = rated power of the farm (kW)
+        'supplied_derivatives' = True once the caller sets dpower_ddirection, needed by 'hermite'
+        'uncertain_var' = 'speed', 'direction' or 'joint'
         'layout' = 'amalia', 'optimized', 'grid', 'random', 'test'
         'distribution' = a distribution object
         'dakota_filename' = 'dakotaInput.in', applicable for dakota method
@@ -28,23 +35,20 @@ def run(method_dict):
     mean = []
     std = []
     samples = []
+    prune_errors = []
 
     for n in range(100,101,1):
 
         ### Set up the wind speeds and wind directions for the problem ###
 
         points, weights = windfarm_setup.getPoints(method_dict, n)
-
-        if method_dict['uncertain_var'] == 'speed':
-            # For wind speed
-            windspeeds = points
-            winddirections = np.ones(n)*225
-        elif method_dict['uncertain_var'] == 'direction':
-            # For wind direction
-            windspeeds = np.ones(n)*8
-            winddirections = points
-        else:
-            raise ValueError('unknown uncertain_var option "%s", valid options "speed" or "direction".' %method_dict['uncertain_var'])
+        # Drop the points with a negligible weight, if method_dict['prune_tol'] is given
+        nPoints = len(weights)
+        points, weights, prune_error = windfarm_setup.pruneNodes(points, weights, method_dict)
+        if method_dict.get('prune_tol') is not None:
+            print 'Pruned %i of %i points, worst case AEP error %g kWh' % (nPoints - len(weights), nPoints, prune_error)
+        windspeeds, winddirections = windfarm_setup.getWindConditions(method_dict, points)
+        n = len(weights)  # number of (direction, speed) pairs at which power is evaluated
 
 
         print 'Locations at which power is evaluated'
@@ -63,49 +67,7 @@ def run(method_dict):
         turbineX = x_y[:,0]
         turbineY = x_y[:,1]
 
-        # turbine size and operating conditions
-
-        rotor_diameter = 126.4  # (m)
-        air_density = 1.1716    # kg/m^3
-
-        # initialize arrays for each turbine properties
-        nTurbs = turbineX.size
-        rotorDiameter = np.zeros(nTurbs)
-        axialInduction = np.zeros(nTurbs)
-        Ct = np.zeros(nTurbs)
-        Cp = np.zeros(nTurbs)
-        generator_efficiency = np.zeros(nTurbs)
-        yaw = np.zeros(nTurbs)
-
-        # define initial values
-        for turbI in range(nTurbs):
-            rotorDiameter[turbI] = rotor_diameter
-            axialInduction[turbI] = 1.0/3.0
-            Ct[turbI] = 4.0*axialInduction[turbI]*(1.0-axialInduction[turbI])
-            Cp[turbI] = 0.7737/0.944 * 4.0 * 1.0/3.0 * np.power((1 - 1.0/3.0), 2)
-            generator_efficiency[turbI] = 0.944
-            yaw[turbI] = 0.     # deg.
-
-        # initialize problem
-        prob = Problem(AEPGroup(nTurbines=nTurbs, nDirections=n,
-                                method_dict=method_dict))
-        prob.setup(check=False)
-
-        # assign initial values to variables
-        prob['windSpeeds'] = windspeeds
-        prob['windDirections'] = winddirections
-        prob['weights'] = weights
-        prob['rotorDiameter'] = rotorDiameter
-        prob['axialInduction'] = axialInduction
-        prob['generatorEfficiency'] = generator_efficiency
-        prob['air_density'] = air_density
-        prob['Ct_in'] = Ct
-        prob['Cp_in'] = Cp
-
-        prob['turbineX'] = turbineX
-        prob['turbineY'] = turbineY
-        for direction_id in range(0, n):
-            prob['yaw%i' % direction_id] = yaw
+        prob = getProblem(method_dict, windspeeds, winddirections, weights, turbineX, turbineY)
 
         # Run the problem
         prob.run()
@@ -119,12 +81,13 @@ def run(method_dict):
         mean.append(mean_data/1e6)
         std.append(std_data/1e6)
         samples.append(n)
+        prune_errors.append(prune_error/1e6)
 
 
     # Save a record of the run
     power = prob['power']
 
-    obj = {'mean': mean, 'std': std, 'samples': samples, 'winddirections': winddirections.tolist(),
+    obj = {'mean': mean, 'std': std, 'samples': samples, 'prune_error': prune_errors, 'winddirections': winddirections.tolist(),
            'windspeeds': windspeeds.tolist(), 'power': power.tolist(),
            'method': method_dict['method'], 'uncertain_variable': method_dict['uncertain_var'],
            'layout': method_dict['layout']}
@@ -141,6 +104,397 @@ def run(method_dict):
     #
     # plt.show()
 
+def runAdaptive(method_dict, tol=0.01, maxLevel=6, minLevel=2):
+    """Add levels of a nested rule until the mean AEP converges.
+
+    The number of points grows as in windfarm_setup.nestedSize, so the
+    points of a level are also points of the next one. The farm power is only
+    computed at the new points, the power at the points of the previous levels is reused. The
+    error of a level is the relative change of the mean from the previous
+    level, the refinement stops when it is below tol, but not before minLevel
+    as the first levels are too coarse for the change to mean anything.
+
+    Args:
+        method_dict (dict): as for run, the 'method' is 'fejer', 'rect' or 'sparse'
+        tol (float): relative tolerance on the mean, e.g. 0.01 for 1%
+        maxLevel (int): last level if the tolerance is not met
+        minLevel (int): first level at which the refinement can stop
+
+    Returns:
+        obj (dict): the mean, std, error, number of points and of power
+            evaluations of each level, and the points and power of the last level
+
+    """
+
+    mean = []
+    std = []
+    samples = []
+    evaluations = []
+    error = []
+    evaluated = {}  # farm power of the (direction, speed) pairs already computed
+
+    turbineX, turbineY = windfarm_setup.getLayout(method_dict['layout'])
+
+    for level in range(maxLevel+1):
+
+        n = windfarm_setup.nestedSize(method_dict['method'], level)
+        points, weights = windfarm_setup.getPoints(method_dict, n)
+        windspeeds, winddirections = windfarm_setup.getWindConditions(method_dict, points)
+        keys = [(round(d, 8), round(s, 8)) for d, s in zip(winddirections, windspeeds)]
+
+        # Only compute the power at the new points
+        new = []
+        seen = set()
+        for i, key in enumerate(keys):
+            if key not in evaluated and key not in seen:
+                new.append(i)
+                seen.add(key)
+        if new:
+            nNew = len(new)
+            prob = getProblem(method_dict, windspeeds[new], winddirections[new], np.zeros(nNew), turbineX, turbineY)
+            prob.run()
+            for i, p in zip(new, prob['power']):
+                evaluated[keys[i]] = p
+        power = np.array([evaluated[key] for key in keys])
+
+        # number of hours in a year, the statistics as in RectStatistics
+        hours = 8760.0
+        mean_data = np.sum(power*weights)*hours
+        std_data = np.sqrt(np.sum(np.power(power - mean_data/hours, 2)*weights))*hours
+        print 'level = ', level, ' points = ', len(weights), ' new evaluations = ', len(new)
+        print 'mean = ', mean_data/1e6, ' GWhrs'
+        print 'std = ', std_data/1e6, ' GWhrs'
+
+        mean.append(mean_data/1e6)
+        std.append(std_data/1e6)
+        samples.append(len(weights))
+        evaluations.append(len(evaluated))
+        if level > 0:
+            error.append(abs(mean[-1] - mean[-2])/abs(mean[-1]))
+            if level >= minLevel and error[-1] < tol:
+                break
+
+    obj = {'mean': mean, 'std': std, 'samples': samples, 'evaluations': evaluations, 'error': error,
+           'converged': level >= minLevel and error[-1] < tol, 'tol': tol,
+           'winddirections': winddirections.tolist(), 'windspeeds': windspeeds.tolist(), 'power': power.tolist(),
+           'method': method_dict['method'], 'uncertain_variable': method_dict['uncertain_var'],
+           'layout': method_dict['layout']}
+    return obj
+
+
+def runReplicates(method_dict, n=100, nReplicates=10):
+    """Statistics of independent replicates of a sampling method.
+
+    Each replicate scrambles the points with its own seed, the spread of the
+    replicates gives a confidence interval of the mean AEP.
+
+    Args:
+        method_dict (dict): as for run, the 'method' is 'sobol', 'halton' or 'lhs'
+        n (int): number of points of each replicate
+        nReplicates (int): number of replicates
+
+    Returns:
+        obj (dict): the mean and std of each replicate, their average, the
+            standard error of the average and a 95% confidence interval
+
+    """
+
+    mean = []
+    std = []
+
+    turbineX, turbineY = windfarm_setup.getLayout(method_dict['layout'])
+
+    for replicate in range(nReplicates):
+
+        method_dict_rep = dict(method_dict)
+        method_dict_rep['replicate'] = replicate
+        points, weights = windfarm_setup.getPoints(method_dict_rep, n)
+        windspeeds, winddirections = windfarm_setup.getWindConditions(method_dict, points)
+
+        prob = getProblem(method_dict, windspeeds, winddirections, weights, turbineX, turbineY)
+        prob.run()
+
+        mean.append(prob['mean']/1e6)
+        std.append(prob['std']/1e6)
+
+    mean_avg = np.mean(mean)
+    std_error = np.std(mean, ddof=1)/np.sqrt(nReplicates) if nReplicates > 1 else np.nan
+    print 'mean = ', mean_avg, ' +/- ', 1.96*std_error, ' GWhrs (95%)'
+    print 'std = ', np.mean(std), ' GWhrs'
+
+    obj = {'mean': mean, 'std': std, 'mean_avg': mean_avg, 'std_avg': np.mean(std), 'std_error': std_error,
+           'confidence_interval': [mean_avg - 1.96*std_error, mean_avg + 1.96*std_error],
+           'samples': n, 'replicates': nReplicates,
+           'method': method_dict['method'], 'uncertain_variable': method_dict['uncertain_var'],
+           'layout': method_dict['layout']}
+    return obj
+
+
+def runImportance(method_dict, n=50, nPilot=20):
+    """Place the directions where the power changes, from a pilot pass.
+
+    The pilot computes the farm power at nPilot equispaced directions, then
+    the 'importance' method of getPoints puts n bins where |dP/dtheta|*pdf is
+    large and the statistics are computed at their midpoints.
+
+    Args:
+        method_dict (dict): as for run, with the 'direction' uncertain_var
+        n (int): number of directions
+        nPilot (int): number of directions of the pilot pass
+
+    Returns:
+        obj (dict): the mean, std, the directions and power of the pilot
+            and of the final evaluation
+
+    """
+
+    if method_dict['uncertain_var'] != 'direction':
+        raise ValueError('the importance method is only available for the "direction" uncertain_var.')
+
+    turbineX, turbineY = windfarm_setup.getLayout(method_dict['layout'])
+
+    # Pilot pass
+    pilot_dict = dict(method_dict)
+    pilot_dict['method'] = 'periodic'
+    pilot_dict['rotation'] = 0.0
+    points, weights = windfarm_setup.getPoints(pilot_dict, nPilot)
+    windspeeds, winddirections = windfarm_setup.getWindConditions(pilot_dict, points)
+    prob = getProblem(pilot_dict, windspeeds, winddirections, weights, turbineX, turbineY)
+    prob.run()
+    pilot_power = np.array(prob['power'])
+    print 'pilot mean = ', prob['mean']/1e6, ' GWhrs'
+
+    # Directions placed with the pilot power
+    method_dict_imp = dict(method_dict)
+    method_dict_imp['method'] = 'importance'
+    method_dict_imp['pilot'] = (winddirections, pilot_power)
+    points, weights = windfarm_setup.getPoints(method_dict_imp, n)
+    windspeeds, winddirections_imp = windfarm_setup.getWindConditions(method_dict_imp, points)
+    prob = getProblem(method_dict_imp, windspeeds, winddirections_imp, weights, turbineX, turbineY)
+    prob.run()
+
+    mean_data = prob['mean']
+    std_data = prob['std']
+    print 'mean = ', mean_data/1e6, ' GWhrs'
+    print 'std = ', std_data/1e6, ' GWhrs'
+
+    obj = {'mean': mean_data/1e6, 'std': std_data/1e6, 'samples': n, 'pilot_samples': nPilot,
+           'pilot_winddirections': winddirections.tolist(), 'pilot_power': pilot_power.tolist(),
+           'winddirections': winddirections_imp.tolist(), 'power': np.array(prob['power']).tolist(),
+           'method': 'importance', 'uncertain_variable': method_dict['uncertain_var'],
+           'layout': method_dict['layout']}
+    return obj
+
+
+def runOffsets(method_dict, n=100):
+    """Statistics of all the offsets of the rule in one farm evaluation.
+
+    The rules of the offsets 0 to Noffset-1 are built at once, the rect
+    rules with windfarm_setup.getRectRules, and the farm power is computed
+    once at the union of their points, the points shared by several offsets
+    only once.
+
+    Args:
+        method_dict (dict): as for run, the 'offset' is not used
+        n (int): number of points of each rule
+
+    Returns:
+        obj (dict): the mean and std of each offset, and the average, min
+            and max of the mean over the offsets
+
+    """
+
+    Noffset = method_dict['Noffset']
+    offsets = range(Noffset)
+
+    # The rules of all the offsets
+    rules = []
+    if method_dict['method'] == 'rect' and method_dict['uncertain_var'] == 'direction':
+        points, weights = windfarm_setup.getRectRules(method_dict, n, offsets)
+        for i in offsets:
+            rules.append((points[0, i], weights[0, i]))
+    else:
+        for i in offsets:
+            method_dict_off = dict(method_dict)
+            method_dict_off['offset'] = i
+            rules.append(windfarm_setup.getPoints(method_dict_off, n))
+
+    # Union of the points
+    keys = []
+    index = {}  # position of each (direction, speed) pair in the union
+    windspeeds = []
+    winddirections = []
+    for points, weights in rules:
+        speeds, directions = windfarm_setup.getWindConditions(method_dict, points)
+        rule_keys = [(round(d, 8), round(s, 8)) for d, s in zip(directions, speeds)]
+        for key, d, s in zip(rule_keys, directions, speeds):
+            if key not in index:
+                index[key] = len(index)
+                winddirections.append(d)
+                windspeeds.append(s)
+        keys.append([index[key] for key in rule_keys])
+    nPoints = len(index)
+    print 'Evaluating %i points for %i offsets of %s points' % (nPoints, Noffset, n)
+
+    # Only the power is needed from the group, the statistics are computed below
+    turbineX, turbineY = windfarm_setup.getLayout(method_dict['layout'])
+    method_dict_rect = dict(method_dict)
+    method_dict_rect['method'] = 'rect'
+    prob = getProblem(method_dict_rect, np.array(windspeeds), np.array(winddirections), np.zeros(nPoints),
+                      turbineX, turbineY)
+    prob.run()
+    power_all = np.array(prob['power'])
+
+    mean = []
+    std = []
+    # number of hours in a year, the statistics as in RectStatistics
+    hours = 8760.0
+    for (points, weights), rule_index in zip(rules, keys):
+        power = power_all[rule_index]
+        mean_data = np.sum(power*weights)
+        std_data = np.sqrt(np.sum(np.power(power - mean_data, 2)*weights))
+        mean.append(mean_data*hours/1e6)
+        std.append(std_data*hours/1e6)
+
+    print 'mean = ', np.mean(mean), ' GWhrs, min = ', np.min(mean), ', max = ', np.max(mean)
+
+    obj = {'mean': mean, 'std': std, 'offsets': offsets, 'samples': n, 'evaluations': nPoints,
+           'mean_avg': np.mean(mean), 'mean_min': np.min(mean), 'mean_max': np.max(mean),
+           'winddirections': winddirections, 'windspeeds': windspeeds, 'power': power_all.tolist(),
+           'method': method_dict['method'], 'uncertain_variable': method_dict['uncertain_var'],
+           'layout': method_dict['layout']}
+    return obj
+
+
+def runHermite(method_dict, n=18):
+    """Statistics from the power and its derivatives at periodic directions.
+
+    The derivatives of the power with respect to the wind directions come
+    from calc_gradient of the AEPGroup, then the problem runs again with
+    these derivatives.
+
+    Args:
+        method_dict (dict): as for run, with the 'direction' uncertain_var
+        n (int): number of directions
+
+    Returns:
+        obj (dict): the mean, std, the directions, power and derivatives
+
+    """
+
+    if method_dict['uncertain_var'] != 'direction':
+        raise ValueError('the hermite method is only available for the "direction" uncertain_var.')
+
+    turbineX, turbineY = windfarm_setup.getLayout(method_dict['layout'])
+
+    method_dict_her = dict(method_dict)
+    method_dict_her['method'] = 'hermite'
+    method_dict_her['symmetry'] = False  # the gradient is with respect to all the directions
+    method_dict_her['supplied_derivatives'] = True  # set below from calc_gradient
+    points, weights = windfarm_setup.getPoints(method_dict_her, n)
+    windspeeds, winddirections = windfarm_setup.getWindConditions(method_dict_her, points)
+    prob = getProblem(method_dict_her, windspeeds, winddirections, weights, turbineX, turbineY)
+    prob.run()
+
+    # The power of each direction only depends on its own direction
+    J = prob.calc_gradient(['windDirections'], ['power'], return_format='array')
+    power = np.array(prob['power'])
+    dpower = np.diag(J)
+    prob['dpower_ddirection'] = dpower
+
+    # Statistics with the derivatives
+    prob.run()
+    mean_data = prob['mean']
+    std_data = prob['std']
+    print 'mean = ', mean_data/1e6, ' GWhrs'
+    print 'std = ', std_data/1e6, ' GWhrs'
+
+    obj = {'mean': mean_data/1e6, 'std': std_data/1e6, 'samples': n,
+           'winddirections': winddirections.tolist(), 'power': power.tolist(), 'dpower_ddirection': dpower.tolist(),
+           'method': 'hermite', 'uncertain_variable': method_dict['uncertain_var'],
+           'layout': method_dict['layout']}
+    return obj
+
+
+def getProblem(method_dict, windspeeds, winddirections, weights, turbineX, turbineY):
+    """Set up the AEPGroup problem of the farm for the given wind conditions.
+
+    With method_dict['symmetry'], the rotation symmetries of the layout are
+    detected and the farm is only evaluated at the directions of the
+    fundamental sector, the power of the other directions is mapped from
+    them. The reflections are also used with method_dict['reflections'],
+    they need a mirror symmetric wake so the lateral wake offset of FLORIS
+    (floris_params ad and bd) is then set to zero.
+    """
+
+    n = len(weights)
+
+    # Directions with the same power because of the layout symmetry
+    symmetry_map = None
+    nEval = n
+    if method_dict.get('symmetry', False):
+        rotations, reflections = windfarm_setup.getLayoutSymmetry(
+            turbineX, turbineY, reflections=method_dict.get('reflections', False))
+        directionsEval, speedsEval, symmetry_map = windfarm_setup.getSymmetricDirections(
+            winddirections, windspeeds, rotations, reflections)
+        nEval = len(directionsEval)
+        print 'Layout symmetry: rotations', rotations, 'reflections', reflections
+        print 'Evaluating %i of %i directions' % (nEval, n)
+
+    # turbine size and operating conditions
+
+    rotor_diameter = 126.4  # (m)
+    air_density = 1.1716    # kg/m^3
+
+    # initialize arrays for each turbine properties
+    nTurbs = turbineX.size
+    rotorDiameter = np.zeros(nTurbs)
+    axialInduction = np.zeros(nTurbs)
+    Ct = np.zeros(nTurbs)
+    Cp = np.zeros(nTurbs)
+    generator_efficiency = np.zeros(nTurbs)
+    yaw = np.zeros(nTurbs)
+
+    # define initial values
+    for turbI in range(nTurbs):
+        rotorDiameter[turbI] = rotor_diameter
+        axialInduction[turbI] = 1.0/3.0
+        Ct[turbI] = 4.0*axialInduction[turbI]*(1.0-axialInduction[turbI])
+        Cp[turbI] = 0.7737/0.944 * 4.0 * 1.0/3.0 * np.power((1 - 1.0/3.0), 2)
+        generator_efficiency[turbI] = 0.944
+        yaw[turbI] = 0.     # deg.
+
+    # initialize problem
+    prob = Problem(AEPGroup(nTurbines=nTurbs, nDirections=n,
+                            method_dict=method_dict, symmetry_map=symmetry_map))
+    prob.setup(check=False)
+
+    # assign initial values to variables
+    prob['windSpeeds'] = windspeeds
+    prob['windDirections'] = winddirections
+    if symmetry_map is not None:
+        prob['windSpeedsEval'] = speedsEval
+        prob['windDirectionsEval'] = directionsEval
+    prob['weights'] = weights
+    prob['rotorDiameter'] = rotorDiameter
+    prob['axialInduction'] = axialInduction
+    prob['generatorEfficiency'] = generator_efficiency
+    prob['air_density'] = air_density
+    prob['Ct_in'] = Ct
+    prob['Cp_in'] = Cp
+
+    prob['turbineX'] = turbineX
+    prob['turbineY'] = turbineY
+    if symmetry_map is not None and reflections:
+        # The mirror images of the wakes are only the same without the lateral offset
+        prob['floris_params:ad'] = 0.0
+        prob['floris_params:bd'] = 0.0
+    for direction_id in range(0, nEval):
+        prob['yaw%i' % direction_id] = yaw
+
+    return prob
+
+
 def plot():
     jsonfile = open('record.json','r')
     a = json.load(jsonfile)
@@ -168,6 +522,17 @@ def get_args():
     parser.add_argument('-l', '--layout', default='optimized', help="specify layout ['amalia', 'optimized', 'grid', 'random', 'test']")
     parser.add_argument('--offset', default=0, type=int, help='offset for starting direction. offset=[0, 1, 2, Noffset-1]')
     parser.add_argument('--Noffset', default=10, type=int, help='number of starting directions to consider')
+    parser.add_argument('--adaptive', action='store_true', help='refine a nested rule until the mean converges')
+    parser.add_argument('--tol', default=0.01, type=float, help='relative tolerance on the mean for --adaptive')
+    parser.add_argument('--maxLevel', default=6, type=int, help='maximum number of refinements for --adaptive')
+    parser.add_argument('--replicates', default=0, type=int, help='number of scrambled replicates for the sampling methods')
+    parser.add_argument('--pilot', default=0, type=int, help='number of pilot directions to place the directions with the power')
+    parser.add_argument('--symmetry', action='store_true', help='only evaluate the directions of the fundamental sector of a symmetric layout')
+    parser.add_argument('--reflections', action='store_true', help='with --symmetry, also use the reflections of the layout, sets the lateral wake offset of FLORIS to zero')
+    parser.add_argument('--all_offsets', action='store_true', help='evaluate the rules of all the Noffset offsets together')
+    parser.add_argument('--hermite', default=0, type=int, help='number of directions of the hermite method, with the power derivatives')
+    parser.add_argument('--prune_tol', default=None, type=float, help='drop the points that change the AEP by less than prune_tol (kWh) in the worst case, power at 0 or at the rated power, the actual change is usually much smaller')
+    parser.add_argument('--rated_power', default=None, type=float, help='rated power of the farm (kW), bounds the power to prune the points')
     parser.add_argument('--version', action='version', version='Statistics convergence 0.0')
     args = parser.parse_args()
     # print args
@@ -197,9 +562,23 @@ if __name__ == "__main__":
     elif method_dict['uncertain_var'] == 'direction':
         dist = distributions.getWindRose()
         method_dict['distribution'] = dist
+    elif method_dict['uncertain_var'] == 'joint':
+        dist = distributions.getJointWindRose()
+        method_dict['distribution'] = dist
     else:
-        raise ValueError('unknown uncertain_var option "%s", valid options "speed" or "direction".' %method_dict['uncertain_var'])
+        raise ValueError('unknown uncertain_var option "%s", valid options "speed", "direction" or "joint".' %method_dict['uncertain_var'])
 
     # Run the problem
-    run(method_dict)
+    if method_dict['adaptive']:
+        runAdaptive(method_dict, method_dict['tol'], method_dict['maxLevel'])
+    elif method_dict['replicates'] > 0:
+        runReplicates(method_dict, 100, method_dict['replicates'])
+    elif method_dict['pilot'] > 0:
+        runImportance(method_dict, 50, method_dict['pilot'])
+    elif method_dict['hermite'] > 0:
+        runHermite(method_dict, method_dict['hermite'])
+    elif method_dict['all_offsets']:
+        runOffsets(method_dict, 100)
+    else:
+        run(method_dict)
     # plot()
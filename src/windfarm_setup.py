@@ -2,13 +2,83 @@ import numpy as np
 # import matplotlib.pyplot as plt
 from getSamplePoints import getSamplePoints
 from dakotaInterface import updateDakotaFile
+from quadrature_rules import histogramGauss, fejer, smolyak, sobol, halton, latinHypercube
+from cache import LRUCache, DiskCache, hashKey, keyFields, getCached
+
+# Points and weights shared by all the getPoints calls in the process
+points_cache = LRUCache(maxsize=256)
+# Entries of method_dict that define the points and weights
+points_keys = ['method', 'distribution', 'offset', 'Noffset', 'sparse_rule', 'anisotropy', 'replicate', 'rotation',
+               'pilot', 'pilot_mix', 'hermite_points', 'design', 'run_dakota']
+# Points in the unit cube of the sampling methods
+sampling_methods = {'sobol': sobol, 'halton': halton, 'lhs': latinHypercube}
+# Lines of the Dakota input file that updateDakotaFile rewrites for every rule
+dakota_rule_lines = ['quadrature_order', 'abscissas', 'ordinates']
+
 
 def getPoints(method_dict, n):
+    """Points and weights of the rule, cached.
+
+    The rule is kept in points_cache, and in method_dict['cache_dir'] if
+    given, keyed by a hash of the scalar fields of the entries in
+    points_keys, n and the Dakota input file, so the same rule is never
+    generated twice. For the dakota method the input file is still updated
+    on a cache hit, DakotaStatistics reads it.
+    """
+
+    key = getPointsKey(method_dict, n)
+    cache_dir = method_dict.get('cache_dir')
+    disk = DiskCache(cache_dir) if cache_dir is not None else None
+    computed = []  # stays empty on a cache hit
+
+    def compute():
+        computed.append(True)
+        return _getPoints(method_dict, n)
+
+    points, weights, dakota_args = getCached(key, compute, points_cache, disk)
+    if dakota_args is not None and not computed:
+        updateDakotaFile(method_dict['dakota_filename'], *dakota_args)
+
+    return points.copy(), weights.copy()
+
+
+def getPointsKey(method_dict, n):
+    """Hash of everything that defines the rule of getPoints.
+
+    The entries in points_keys are turned into scalars and tuples by
+    keyFields, the distribution by its key(), so the key is the same in
+    every process and the DiskCache hits across runs.
+    """
+
+    values = [keyFields(method_dict.get(k)) for k in points_keys]
+    dakota_input = None
+    if method_dict['method'] == 'dakota':
+        with open(method_dict['dakota_filename'], 'r') as f:
+            dakota_input = [line for line in f if not any(k in line for k in dakota_rule_lines)]
+    return hashKey('points', values, n, dakota_input)
+
+
+def _getPoints(method_dict, n):
 
     method = method_dict['method']
     dist = method_dict['distribution']
+    dakota_args = None  # Arguments of updateDakotaFile for the dakota method
+
+    if method in sampling_methods or method == 'regression':  # For the sampling methods, in any dimension
+        points, weights = getPointsSampling(method_dict, n)
+        return points, weights, dakota_args
 
-    if dist._str() == 'Amalia windrose':  # For direction case
+    if getattr(dist, 'direction_dist', None) is not None:  # For joint direction and speed case
+        if method == 'sparse':
+            points, weights = getPointsSparse(method_dict, n)
+        else:
+            points, weights = getPoints2D(method_dict, n)
+        return points, weights, dakota_args
+
+    windrose = getattr(dist, 'windrose', None)
+    if windrose is not None:  # For direction case
+        if method not in ['rect', 'rect-extrapolated', 'periodic', 'hermite', 'importance', 'fejer', 'dakota']:
+            raise ValueError('the "%s" method is not available for the wind direction' % method)
         # Modify the input range to start at max probability location
         # and account for zero probability regions.
 
@@ -26,10 +96,10 @@ def getPoints(method_dict, n):
         b = bnd[1]  # right boundary
         a = a[0] # get rid of the list
         b = b[0] # get rid of the list
-        # Make sure the A, B, C values are the same than those in distribution
-        A = 110  # Left boundary of zero probability region
-        B = 140  # Right boundary of zero probability region
-        C = 225  # Location of max probability
+        # The A, B, C values come from the wind rose of the distribution
+        A = windrose.A  # Left boundary of zero probability region
+        B = windrose.B  # Right boundary of zero probability region
+        C = windrose.C  # Location of max probability
         r = b-a  # original range
         R = r - (B-A) # modified range
 
@@ -39,16 +109,50 @@ def getPoints(method_dict, n):
         i = method_dict['offset']  # i = [0, 1, 2, N-1]
 
         if method == 'rect':
-            # the offset fits N points in the given dx interval
-            dx = R/n
-            offset = i*dx/N
-            bounds = [a+offset, R+offset]
-            x = np.linspace(bounds[0], bounds[1], n+1)
-            x = x[:-1]+dx/2  # Take the midpoints of the bins
-            # Modify x, to start from the max probability location
+            # Midpoints of n bins shifted by the offset, moved to start from
+            # the max probability location, and their probabilities
+            x, w = getRectRules(method_dict, n)
+            x = x[0, 0]
+            w = w[0, 0]
+
+        if method == 'rect-extrapolated':
+            # The rect rule with each bin split in three, the point 3*j+1 is
+            # the point j of the rect rule with n points. n is rounded up to
+            # a multiple of 3 for the third rule of RichardsonStatistics
+            n = 3*int(np.ceil(n/3.))
+            x, w = getRectRules(method_dict, 3*n, 3*i)
+            x = x[0, 0]
+            w = w[0, 0]
+
+        if method == 'periodic':
+            # Trapezoidal rule over the whole circle, the direction is
+            # periodic so there is no need to move the end points
+            x = getPeriodicNodes(method_dict, n)
+            w = r/n*dist.pdf(x)
+
+        if method == 'hermite':
+            # Periodic directions, the weights of the values in the
+            # integral of the Hermite interpolant
+            x = getPeriodicNodes(method_dict, n)
+            B_val, B_der, w_fine = getHermiteInterpolation(method_dict, n)
+            w = np.dot(w_fine, B_val)
+
+        if method == 'importance':
+            # Bins with equal shares of |dP/dtheta|*pdf from a pilot power
+            x, w = getImportanceRule(method_dict, n)
+
+        if method == 'fejer':
+            # Nested rule on the modified range, the offset modifies the
+            # starting point C as for the dakota method
+            offset = i*r/N
+            C = (C + offset) % r
+            # Make sure the offset is not between A and B
+            if A < C and C < B:
+                C = min([A, B], key=lambda x:abs(x-C))
+            t, wt = fejer(n)
+            x = R/2. + R/2.*t
             x = modifyx(x, A, B, C, r)
-            # Get the weights associated with the points locations
-            w = getWeights(x, dx, dist)
+            w = R/2.*wt*dist.pdf(x)
 
         if method == 'dakota':
             # the offset modifies the starting point for 5 locations within the whole interval
@@ -68,12 +172,13 @@ def getPoints(method_dict, n):
             f = dist.pdf(ynew)
 
             # Modify y to -1 to 1 range, I think makes dakota generation of polynomials easier
-            y = 2*y / 330 - 1
+            y = 2*y / R - 1
             updateDakotaFile(method_dict['dakota_filename'], n, y, f)
-            # run Dakota file to get the points locations
-            x, wd = getSamplePoints(method_dict['dakota_filename'])
+            dakota_args = (n, y, f)
+            # Get the points locations, the Dakota file is still updated for DakotaStatistics
+            x, wd = getDakotaPoints(method_dict, n, y, f)
             # Rescale x
-            x = 330/2. + 330/2.*x
+            x = R/2. + R/2.*x
             # Call modify x with the new x.
             x = modifyx(x, A, B, C, r)
             # Get the weights associated with the points locations
@@ -83,6 +188,8 @@ def getPoints(method_dict, n):
         weights = w
 
     else:  # This is mostly for speed case
+        if method not in ['rect', 'rect-extrapolated', 'fejer', 'dakota']:
+            raise ValueError('the "%s" method is not available for the wind speed' % method)
         # Don't modify the range at all.
         bnd = dist.range()
         a = bnd[0]
@@ -91,32 +198,27 @@ def getPoints(method_dict, n):
         b = b[0]  # get rid of the list
 
         if method == 'rect':
-            # the offset fits N points in the given dx interval
-            # Modify with offset, manually choose the offset you want
-            N = 5
-            i = 0  # [-2, -1, 0, 1, 2] choose from for N=5, for general N [-int(np.floor(N/2)), ... , int(np.floor(N/2)+1]
-            dx = (b-a)/n
-            offset = i*dx/N
-            bounds = [a+offset, b+offset]
-            x = np.linspace(bounds[0], bounds[1], n+1)
-            x = x[:-1]+dx/2  # Take the midpoints of the bins
-            # Get the weights associated with the points locations
-            w = []
-            for xi in x:
-                xleft = xi-dx/2.
-                xright = xi+dx/2.
-                if xleft < a:
-                    # print 'I am in xleft'
-                    xleft = a
-                if xright > b:
-                    # print 'I am in xright'
-                    xright = b
-                w.append(dist._cdf(xright) - dist._cdf(xleft))
-            w = np.array(w).flatten()
+            # Midpoints of n bins and their probabilities
+            x, w = getRectRules(method_dict, n)
+            x = x[0, 0]
+            w = w[0, 0]
             # print np.sum(w)
             # print dist._cdf(b)  # this value should weight dakota weights. b=30
 
 
+        if method == 'rect-extrapolated':
+            # The rect rule with each bin split in three, n a multiple of 3
+            n = 3*int(np.ceil(n/3.))
+            x, w = getRectRules(method_dict, 3*n)
+            x = x[0, 0]
+            w = w[0, 0]
+
+        if method == 'fejer':
+            # Nested rule between the bounds
+            t, wt = fejer(n)
+            x = (a+b)/2. + (b-a)/2.*t
+            w = (b-a)/2.*wt*dist.pdf(x)
+
         if method == 'dakota':
             # The offset doesn't really make sense for this case
             # Update dakota file with desired number of sample points
@@ -129,8 +231,9 @@ def getPoints(method_dict, n):
             y = 2*y / 30 - 1
 
             updateDakotaFile(method_dict['dakota_filename'], n, y, f)
-            # run Dakota file to get the points locations
-            x, wd = getSamplePoints(method_dict['dakota_filename'])
+            dakota_args = (n, y, f)
+            # Get the points locations, the Dakota file is still updated for DakotaStatistics
+            x, wd = getDakotaPoints(method_dict, n, y, f)
             # Rescale x
             x = 30/2. + 30/2.*x
 
@@ -142,47 +245,592 @@ def getPoints(method_dict, n):
         # print weights
         # print np.sum(weights)
 
+    return points, weights, dakota_args
+
+
+def getDakotaPoints(method_dict, n, y, f):
+    """Gauss points and weights of the histogram in the Dakota file.
+
+    The rule is generated in process with Golub-Welsch, which reproduces the
+    points of Dakota's histogram_bin_uncertain to about 1e-5. Set
+    method_dict['run_dakota'] = True to run Dakota instead.
+
+    Args:
+        method_dict (dict): the UQ method parameters
+        n (int): number of points, the quadrature_order
+        y (np.array): the abscissas of the histogram in [-1, 1]
+        f (np.array): the ordinates of the histogram
+
+    Returns:
+        x (np.array): the points in [-1, 1]
+        w (np.array): the weights
+
+    """
+    if method_dict.get('run_dakota', False):
+        # run Dakota file to get the points locations
+        return getSamplePoints(method_dict['dakota_filename'])
+    return histogramGauss(n, y, f)
+
+
+def getPoints2D(method_dict, n):
+    """Tensor product of direction and speed points for a joint distribution.
+
+    The directions come from getPoints with the direction distribution and
+    the method in method_dict. The speeds are the midpoints of n bins
+    between the speed bounds, weighted by the speed distribution conditioned
+    on each direction.
+
+    Args:
+        method_dict (dict): the 'distribution' is a joint distribution from distributions.getJointWindRose
+        n (int or tuple): number of points per dimension, or (nDirections, nSpeeds)
+
+    Returns:
+        points (np.array): shape (2, nDirections*nSpeeds), the rows are directions and speeds
+        weights (np.array): the weight of each (direction, speed) pair
+
+    """
+
+    dist = method_dict['distribution']
+    if np.isscalar(n):
+        nDirections, nSpeeds = n, n
+    else:
+        nDirections, nSpeeds = n
+
+    # Direction points from the one dimensional rule
+    method_dict_dir = dict(method_dict)
+    method_dict_dir['distribution'] = dist.direction_dist
+    directions, w_dir = getPoints(method_dict_dir, nDirections)
+
+    # Speed bins, the same speeds for every direction
+    a = dist.lo
+    b = dist.hi
+    dx = (b-a)/float(nSpeeds)
+    edges = np.linspace(a, b, nSpeeds+1)
+    speeds = edges[:-1]+dx/2  # Take the midpoints of the bins
+    F = dist.speed_cdf(edges[np.newaxis, :], directions[:, np.newaxis])
+    w_speed = np.diff(F, axis=1)  # conditional probability of each speed bin
+
+    winddirections, windspeeds = np.meshgrid(directions, speeds, indexing='ij')
+    points = np.array([winddirections.flatten(), windspeeds.flatten()])
+    weights = (w_dir[:, np.newaxis]*w_speed).flatten()
+
+    return points, weights
+
+
+def getImportanceRule(method_dict, n, nFine=3600):
+    """Midpoint rule with the bins placed where the power changes.
+
+    The pilot power method_dict['pilot'] = (directions, power), from a
+    cheap first pass, is interpolated on the circle. The n bins have equal
+    shares of the density g = (1-mix)*|dP/dtheta|*pdf + mix*pdf, each part
+    normalized, with mix = method_dict['pilot_mix'] (default 0.5), so the
+    bins are narrow at the wake dips. The bins cover the directions outside
+    of the zero probability region (A, B) of the wind rose, as the rect rule
+    (modifyx). The weights are the probabilities of the bins from the cdf,
+    so they add up to one and RectStatistics applies.
+
+    Args:
+        method_dict (dict): the direction 'distribution' and the 'pilot'
+        n (int): number of bins
+        nFine (int): number of directions of the density g
+
+    Returns:
+        x (np.array): the midpoints of the bins
+        w (np.array): the probability of each bin
+
+    """
+
+    dist = method_dict['distribution']
+    directions, power = method_dict['pilot']
+    mix = method_dict.get('pilot_mix', 0.5)
+    bnd = dist.range()
+    a = bnd[0][0]
+    b = bnd[1][0]
+    r = b-a
+    A = dist.windrose.A  # Left boundary of zero probability region
+    B = dist.windrose.B  # Right boundary of zero probability region
+    R = r - (B-A)  # modified range
+
+    # Density of the bins on a fine grid of the modified range, from B to A
+    # around the circle, so no bin spans the zero probability region
+    du = R/float(nFine)
+    u_fine = du*(np.arange(nFine)+0.5)
+    x_fine = modifyx(u_fine, A, B, B, r)
+    order = np.argsort(directions)
+    P = np.interp(x_fine, np.asarray(directions)[order], np.asarray(power)[order], period=r)
+    dP = (np.roll(P, -1) - np.roll(P, 1))/(2*du)  # periodic central difference
+    f = np.asarray(dist.pdf(x_fine)).flatten()
+    g = np.abs(dP)*f
+    if np.sum(g) > 0:
+        g = (1-mix)*g/np.sum(g) + mix*f/np.sum(f)
+    else:  # flat pilot power
+        g = f/np.sum(f)
+
+    # Bin edges with equal shares of g
+    G = np.concatenate([[0.0], np.cumsum(g)])
+    G = G/G[-1]
+    edges = np.interp(np.linspace(0, 1, n+1), G, du*np.arange(nFine+1))
+    x = modifyx((edges[:-1] + edges[1:])/2, A, B, B, r)  # Take the midpoints of the bins
+    left = modifyx(edges[:-1], A, B, B, r)
+    right = modifyx(edges[1:], A, B, B, r)
+    right[-1] = A  # the last bin ends at A, not at B
+    w = _cdf(dist, right) - _cdf(dist, left) + (right < left)  # bins that cross 360
+
+    return x, w
+
+
+def getHermiteInterpolation(method_dict, n):
+    """Piecewise cubic Hermite interpolation of the power between the periodic directions.
+
+    The interpolant uses the power and its derivative with respect to the
+    direction at the directions of getPeriodicNodes, and is evaluated on a
+    fine grid of method_dict['hermite_points'] directions (3600 by default),
+    where the probability of each fine bin comes from the cdf.
+
+    Args:
+        method_dict (dict): the direction 'distribution' and the 'rotation'
+        n (int): number of directions
+
+    Returns:
+        B_val (np.array): shape (nFine, n), the interpolated power at the
+            fine directions is np.dot(B_val, power) + np.dot(B_der, dpower)
+        B_der (np.array): shape (nFine, n), dpower is in power per degree
+        w_fine (np.array): the probability of the bin of each fine direction
+
+    """
+
+    dist = method_dict['distribution']
+    bnd = dist.range()
+    a = bnd[0][0]
+    b = bnd[1][0]
+    r = b-a
+    x = getPeriodicNodes(method_dict, n)
+    nFine = method_dict.get('hermite_points', 3600)
+
+    dx = r/float(nFine)
+    y = a + dx*(np.arange(nFine)+0.5)
+    w_fine = getWeights(y, dx, dist)
+
+    # Interval [x[k], x[k+1]] of each fine direction, periodic
+    order = np.argsort(x)
+    xs = x[order]
+    k = (np.searchsorted(xs, y, side='right') - 1) % n
+    left = xs[k] - r*(y < xs[k])
+    h = (xs[(k+1) % n] - xs[k]) % r
+    h[h == 0] = r  # a single direction
+    t = (y - left)/h
+
+    B_val = np.zeros((nFine, n))
+    B_der = np.zeros((nFine, n))
+    j = np.arange(nFine)
+    np.add.at(B_val, (j, order[k]), 2*t**3 - 3*t**2 + 1)
+    np.add.at(B_val, (j, order[(k+1) % n]), -2*t**3 + 3*t**2)
+    np.add.at(B_der, (j, order[k]), h*(t**3 - 2*t**2 + t))
+    np.add.at(B_der, (j, order[(k+1) % n]), h*(t**3 - t**2))
+
+    return B_val, B_der, w_fine
+
+
+def getPeriodicNodes(method_dict, n):
+    """Equispaced directions of the periodic method.
+
+    The first direction is method_dict['rotation'] (default 0), or a random
+    angle of the first interval for 'random', with the seed
+    method_dict['replicate'].
+    """
+
+    dist = method_dict['distribution']
+    bnd = dist.range()
+    a = bnd[0][0]
+    b = bnd[1][0]
+    r = b-a
+    rotation = method_dict.get('rotation', 0.0)
+    if rotation == 'random':
+        rotation = np.random.RandomState(method_dict.get('replicate', 0)).uniform(0, r/n)
+    return a + (rotation + r*np.arange(n)/float(n)) % r
+
+
+def getPointsSampling(method_dict, n):
+    """Sobol, Halton or Latin hypercube points through the inverse cdf.
+
+    The points in the unit cube are scrambled with the seed
+    method_dict['replicate'] (default 0), so the statistics of several
+    replicates give an error estimate. For a joint distribution the
+    direction comes from the first coordinate and the speed from the second
+    one, through the inverse of the cdf conditioned on the direction. The
+    regression method uses the points of method_dict['design'], 'sobol' by
+    default.
+
+    Args:
+        method_dict (dict): the 'method' is 'sobol', 'halton', 'lhs' or 'regression'
+        n (int): number of points
+
+    Returns:
+        points (np.array): the points, shape (2, n) for a joint distribution
+        weights (np.array): the probability inside the bounds divided by n
+
+    """
+
+    dist = method_dict['distribution']
+    rng = np.random.RandomState(method_dict.get('replicate', 0))
+    method = method_dict['method']
+    if method == 'regression':
+        method = method_dict.get('design', 'sobol')
+
+    if getattr(dist, 'direction_dist', None) is not None:  # For joint direction and speed case
+        u = sampling_methods[method](n, 2, rng)
+        directions = np.asarray(dist.direction_dist.inv(u[0])).flatten()
+        speeds = dist.speed_ppf(u[1], directions)  # truncated to the speed bounds
+        points = np.array([directions, speeds])
+        # The probability of the speeds inside the bounds, as in getPoints2D
+        weights = (dist.speed_cdf(dist.hi, directions) - dist.speed_cdf(dist.lo, directions))/n
+
+    else:
+        u = sampling_methods[method](n, 1, rng)
+        points = np.asarray(dist.inv(u[0])).flatten()
+        bnd = dist.range()
+        a = bnd[0][0]
+        b = bnd[1][0]
+        weights = np.ones(n)*(dist._cdf(b) - dist._cdf(a))/n
+
     return points, weights
 
 
+def getPointsSparse(method_dict, level):
+    """Smolyak sparse grid of direction and speed for a joint distribution.
+
+    The direction rule of each level comes from getPoints with the direction
+    distribution and method_dict['sparse_rule'], 'fejer' (default) or
+    'rect', with nestedSize points. The speed rule is the same rule between
+    the speed bounds, and the conditional speed pdf is applied to the
+    weights of the sparse grid.
+
+    Args:
+        method_dict (dict): the 'distribution' is a joint distribution from
+            distributions.getJointWindRose, and method_dict['anisotropy'] the
+            optional weights of (direction, speed), e.g. [1, 2] gives the
+            speed lower levels
+        level (int): the level of the sparse grid
+
+    Returns:
+        points (np.array): shape (2, nPoints), the rows are directions and speeds
+        weights (np.array): the weight of each (direction, speed) pair
+
+    """
+
+    dist = method_dict['distribution']
+    rule = method_dict.get('sparse_rule', 'fejer')
+    a = dist.lo
+    b = dist.hi
+
+    method_dict_dir = dict(method_dict)
+    method_dict_dir['method'] = rule
+    method_dict_dir['distribution'] = dist.direction_dist
+
+    def directionRule(l):
+        return getPoints(method_dict_dir, nestedSize(rule, l))
+
+    def speedRule(l):
+        n = nestedSize(rule, l)
+        if rule == 'fejer':
+            t, wt = fejer(n)
+            return (a+b)/2. + (b-a)/2.*t, (b-a)/2.*wt
+        dx = (b-a)/float(n)
+        return np.linspace(a, b, n+1)[:-1]+dx/2, dx*np.ones(n)
+
+    points, weights = smolyak([directionRule, speedRule], level, method_dict.get('anisotropy'))
+    weights = weights*dist.speed_pdf(points[1], points[0])
+
+    return points, weights
+
+
+def nestedSize(method, level):
+    """Number of points of a level of the nested rules.
+
+    Fejer's rule with 2**(level+1)-1 points contains the rule of the previous
+    level, as do the midpoints of 3**level rectangles (for offset 0), and
+    the sparse grids of these rules.
+    """
+    if method == 'fejer':
+        return 2**(level+1) - 1
+    elif method == 'rect':
+        return 3**level
+    elif method == 'sparse':
+        return level  # the n of getPoints is the level of the sparse grid
+    else:
+        raise ValueError('no nested rule for the method "%s", valid options "fejer", "rect" or "sparse".' %method)
+
+
+def getRectRules(method_dict, n, offset=None):
+    """Rectangle rules for several numbers of points and offsets at once.
+
+    The same rule as the rect method of getPoints, built with array
+    operations for all the n and offset values, e.g. to compare the
+    convergence or the offset spread without a loop over getPoints.
+
+    Args:
+        method_dict (dict): the 'distribution' and, for the direction case, 'Noffset'
+        n (int or array): number of points of each rule
+        offset (int or array): offsets i, the rule is shifted by i*dx/Noffset.
+            Defaults to method_dict['offset'] for the direction case and to 0
+            (of N = 5) for the speed case, as getPoints
+
+    Returns:
+        points (np.array): shape (len(n), len(offset), max(n)), the rule for
+            n[k] and offset[l] is points[k, l, :n[k]], the rest is nan
+        weights (np.array): same shape, zero past n[k]
+
+    """
+
+    dist = method_dict['distribution']
+    n = np.atleast_1d(n)
+    bnd = dist.range()
+    a = bnd[0][0]  # left boundary
+    b = bnd[1][0]  # right boundary
+
+    # Axis 0 is n, axis 1 the offset and axis 2 the points
+    nn = n[:, np.newaxis, np.newaxis].astype(float)
+    j = np.arange(np.max(n))[np.newaxis, np.newaxis, :]
+
+    windrose = getattr(dist, 'windrose', None)
+    if windrose is not None:  # For direction case
+        if offset is None:
+            offset = method_dict['offset']
+        offset = np.atleast_1d(offset)[np.newaxis, :, np.newaxis]
+        A = windrose.A  # Left boundary of zero probability region
+        B = windrose.B  # Right boundary of zero probability region
+        C = windrose.C  # Location of max probability
+        r = b-a  # original range
+        R = r - (B-A)  # modified range
+        N = method_dict['Noffset']
+        # the offset fits N points in the given dx interval
+        dx = R/nn
+        step = (R-a)/nn  # the bins start at a+offset and end at R+offset
+        x = a + offset*dx/N + step*j + dx/2  # Take the midpoints of the bins
+        # Modify x, to start from the max probability location
+        x = modifyx(x, A, B, C, r)
+        # Get the weights associated with the points locations
+        w = getWeights(x, dx, dist)
+
+    else:  # This is mostly for speed case
+        if offset is None:
+            offset = 0  # [-2, -1, 0, 1, 2] choose from for N=5
+        offset = np.atleast_1d(offset)[np.newaxis, :, np.newaxis]
+        N = 5
+        dx = (b-a)/nn
+        x = a + offset*dx/N + dx*j + dx/2  # Take the midpoints of the bins
+        # The bins are cut at the boundaries
+        xleft = np.clip(x-dx/2., a, b)
+        xright = np.clip(x+dx/2., a, b)
+        w = _cdf(dist, xright) - _cdf(dist, xleft)
+
+    valid = j < nn
+    points = np.where(valid, x, np.nan)
+    weights = np.where(valid, w, 0.0)
+    return points, weights
+
+
+def _cdf(dist, x):
+    """dist._cdf of an array of any shape."""
+    x = np.asarray(x, dtype=float)
+    return np.asarray(dist._cdf(x.flatten())).reshape(x.shape)
+
+
 def modifyx(x, A=110, B=140, C=225, r=360):
 
     # Modify x, to start from the max probability location
-    x = (C+x)%r
-    y = []
-    for xi in x:
-        if A<C:
-            if xi > A and xi < C:
-                xi = (xi + B-A)%r  # I don't think the mod r is necessary for all of these.
-            y.append(xi)
-        else:
-            if xi > A:
-                xi = (xi + B-A)%r
-            else:
-                if xi < C:
-                    xi = (xi + B-A)%r
-            y.append(xi)
-    return np.array(y)
+    x = (C+np.asarray(x, dtype=float)) % r
+    # Skip the zero probability region between A and B
+    if A<C:
+        skip = (x > A) & (x < C)
+    else:
+        skip = (x > A) | (x < C)
+    return np.where(skip, (x + B-A) % r, x)  # I don't think the mod r is necessary for all of these.
 
 
 def getWeights(x, dx, dist):
     # Logic to get the weights from integrating the pdf between the bins
-    w = []
-    for xi in x:
-        xleft = xi-dx/2.
-        xright = xi+dx/2.
-        if xright > 360.0:
-            w.append(1 - dist._cdf(xleft) + dist._cdf(xright-360))
-        elif xleft < 0.0:
-            w.append(dist._cdf(xright) + (1 - dist._cdf(360+xleft)))
-        else:
-            w.append(dist._cdf(xright) - dist._cdf(xleft))
-        # print xi+dx/2., xi-dx/2.
-    w = np.array(w).flatten()
+    # x and dx are arrays of any shapes that broadcast together
+    x = np.asarray(x, dtype=float)
+    xleft = x-dx/2.
+    xright = x+dx/2.
+    # Bins that cross 360 or 0 are split in two
+    wrap_right = xright > 360.0
+    wrap_left = ~wrap_right & (xleft < 0.0)
+    xright = np.where(wrap_right, xright-360, xright)
+    xleft = np.where(wrap_left, 360+xleft, xleft)
+    w = _cdf(dist, xright) - _cdf(dist, xleft) + (wrap_right | wrap_left)
     # print w  # all weights should be positive
     # print np.sum(w)   # this should sum to 1
     return w
 
+
+def pruneNodes(points, weights, method_dict):
+    """Drop the points whose weight cannot change the AEP by more than a tolerance.
+
+    The points are dropped from the smallest weight up while the sum of
+    their weights times the rated power of the farm and the hours of a year
+    is below method_dict['prune_tol'] (kWh). The weight of each dropped
+    point goes to the nearest point that is kept (the directions are
+    periodic), so the total probability is unchanged. As the power is
+    between 0 and the rated power method_dict['rated_power'] (kW), moving a
+    weight w changes the mean AEP by at most w*rated_power*hours.
+
+    Args:
+        points (np.array): the points of getPoints
+        weights (np.array): the weights of getPoints
+        method_dict (dict): with 'prune_tol', 'rated_power' and 'uncertain_var'
+
+    Returns:
+        points (np.array): the points that are kept
+        weights (np.array): their weights
+        error (float): the worst case change of the mean AEP (kWh), a loose
+            bound, the power at the dropped points is far from both 0 and
+            the rated power in practice
+
+    """
+
+    tol = method_dict.get('prune_tol')
+    if tol is None:
+        return points, weights, 0.0
+    # Only the methods of RectStatistics take the points and weights as given
+    if method_dict['method'] not in ['rect', 'fejer', 'sparse', 'sobol', 'halton', 'lhs', 'importance']:
+        raise ValueError('the points of the "%s" method cannot be pruned, its statistics need all of them' % method_dict['method'])
+    rated_power = method_dict.get('rated_power')
+    if rated_power is None:
+        raise ValueError('method_dict["rated_power"] is needed to prune the points')
+
+    # number of hours in a year
+    hours = 8760.0
+    order = np.argsort(np.abs(weights))
+    bound = np.cumsum(np.abs(weights[order]))*rated_power*hours
+    nDrop = min(np.searchsorted(bound, tol, side='right'), len(weights)-1)  # keep at least one point
+    drop = order[:nDrop]
+    keep = np.sort(order[nDrop:])
+    error = bound[nDrop-1] if nDrop > 0 else 0.0
+
+    # Nearest kept point, directions over 360 and speeds over their range
+    windspeeds, winddirections = getWindConditions(method_dict, points)
+    d_dir = np.abs(winddirections[drop, np.newaxis] - winddirections[np.newaxis, keep]) % 360.
+    d_dir = np.minimum(d_dir, 360. - d_dir)/360.
+    d_speed = np.abs(windspeeds[drop, np.newaxis] - windspeeds[np.newaxis, keep])/max(np.ptp(windspeeds), 1.0)
+    nearest = np.argmin(d_dir**2 + d_speed**2, axis=1)
+
+    new_weights = weights[keep].copy()
+    np.add.at(new_weights, nearest, weights[drop])
+
+    return points[..., keep], new_weights, error
+
+
+def getWindConditions(method_dict, points):
+    """Wind speeds and directions at the points of getPoints."""
+
+    if method_dict['uncertain_var'] == 'speed':
+        # For wind speed
+        windspeeds = points
+        winddirections = np.ones(len(points))*225
+    elif method_dict['uncertain_var'] == 'direction':
+        # For wind direction
+        windspeeds = np.ones(len(points))*8
+        winddirections = points
+    elif method_dict['uncertain_var'] == 'joint':
+        # For wind direction and wind speed together
+        winddirections = points[0]
+        windspeeds = points[1]
+    else:
+        raise ValueError('unknown uncertain_var option "%s", valid options "speed", "direction" or "joint".' %method_dict['uncertain_var'])
+    return windspeeds, winddirections
+
+
+def getLayoutSymmetry(turbineX, turbineY, tol=1e-6, reflections=False):
+    """Rotations and reflections about the centroid that map the layout onto itself.
+
+    The candidate rotations are the multiples of 15 degrees and the candidate
+    reflection axes the multiples of 7.5 degrees, which covers the 2, 3, 4,
+    6, 8, 12 and 24 fold symmetries. The power is only symmetric if all the
+    turbines are the same and have the same yaw, the layout does not say.
+    A reflection also needs a mirror symmetric wake, FLORIS's lateral wake
+    offset (floris_params ad and bd) breaks it, so the reflections are only
+    searched on request.
+
+    Args:
+        turbineX (np.array): turbine positions
+        turbineY (np.array): turbine positions
+        tol (float): tolerance on the positions, relative to the farm size
+        reflections (bool): also search the reflections
+
+    Returns:
+        rotations (list): angles of the rotations (deg, ccw), 0 included
+        reflections (list): angles of the reflection axes (deg, ccw from +x)
+
+    """
+
+    x = np.asarray(turbineX, dtype=float) - np.mean(turbineX)
+    y = np.asarray(turbineY, dtype=float) - np.mean(turbineY)
+    size = max(np.max(np.sqrt(x**2 + y**2)), 1.0)
+
+    def maps_onto(xt, yt):
+        # Every transformed turbine is on a turbine
+        d = (xt[:, np.newaxis] - x[np.newaxis, :])**2 + (yt[:, np.newaxis] - y[np.newaxis, :])**2
+        return np.all(np.min(d, axis=1) < (tol*size)**2)
+
+    rotations = []
+    for beta in np.arange(0., 360., 15.):
+        c, s = np.cos(np.radians(beta)), np.sin(np.radians(beta))
+        if maps_onto(c*x - s*y, s*x + c*y):
+            rotations.append(beta)
+    axes = []
+    for alpha in np.arange(0., 180., 7.5) if reflections else []:
+        c, s = np.cos(np.radians(2*alpha)), np.sin(np.radians(2*alpha))
+        if maps_onto(c*x + s*y, s*x - c*y):
+            axes.append(alpha)
+
+    return rotations, axes
+
+
+def getSymmetricDirections(winddirections, windspeeds, rotations, reflections):
+    """Directions of the fundamental sector with the same power as the given directions.
+
+    The wind directions follow the FLORIS convention, a wind from theta
+    blows towards 270-theta ccw from +x. A rotation of the layout by beta
+    gives the same power at theta-beta, and a reflection about the axis at
+    alpha at 540-2*alpha-theta. Each direction is replaced by the smallest
+    of its images, so the directions with the same power are evaluated once.
+
+    Args:
+        winddirections (np.array): the wind directions (deg)
+        windspeeds (np.array): the wind speeds
+        rotations (list): from getLayoutSymmetry
+        reflections (list): from getLayoutSymmetry
+
+    Returns:
+        directionsEval (np.array): the directions to evaluate
+        speedsEval (np.array): their wind speeds
+        symmetry_map (np.array): the index in directionsEval of each direction
+
+    """
+
+    theta = np.asarray(winddirections, dtype=float)
+    images = [(theta - beta) % 360. for beta in rotations]
+    images += [(540. - 2*alpha - theta) % 360. for alpha in reflections]
+    images = np.round(np.array(images), 8) % 360.
+    canonical = np.min(images, axis=0)
+
+    keys = [(d, round(s, 8)) for d, s in zip(canonical, windspeeds)]
+    index = {}
+    directionsEval = []
+    speedsEval = []
+    symmetry_map = []
+    for key, d, s in zip(keys, canonical, windspeeds):
+        if key not in index:
+            index[key] = len(index)
+            directionsEval.append(d)
+            speedsEval.append(s)
+        symmetry_map.append(index[key])
+
+    return np.array(directionsEval), np.array(speedsEval), np.array(symmetry_map)
+
+
 def getLayout(layout='grid'):
     ### Set up the farm ###
 